@@ -0,0 +1 @@
+"""Offline benchmarks. Run them from the repository root, eg: `python -m benchmarks.cold_start`"""
@@ -0,0 +1,209 @@
+"""Replay questions through the Genesis agent offline and report its cost.
+
+The agent is built by `genesis.chat_chain.agent_chain` as in production. It
+uses a scripted chat model instead of OpenAI and an in-process Genesis stand-in
+serving a synthetic fleet instead of the live server. For each question it
+reports LLM calls, tool calls, Genesis requests, tokens and wall time as JSON.
+Genesis requests go through a response cache as in production, so they count
+the requests that would reach the server.
+
+No Genesis settings are needed: the spec is read from `genesis_openapi.yaml`
+and the rest is passed in. (Only a plan using `genesis_unit_search` reads
+GENESIS_UNIT_INDEX_TTL, which needs GENESIS_AUTH_TOKEN or a .env file.)
+
+Usage: python -m benchmarks.agent_replay [questions.txt] [--llm-latency S] [--api-latency S]
+"""
+
+import re
+import json
+import time
+import argparse
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.chat_models.base import BaseChatModel
+from langchain.memory import ConversationBufferMemory
+from langchain.schema import AIMessage, BaseMessage, ChatGeneration, ChatResult, HumanMessage, LLMResult
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .synthetic_fleet import make_synthetic_fleet
+from .genesis_stand_in import GenesisFleetRoutes, StandInRequests
+
+
+Plan = List[Tuple[str, dict]]
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _make_token_counter() -> Tuple[str, Callable[[str], int]]:
+    """tiktoken if its encoding is available offline, else a word/punctuation count"""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding('cl100k_base')
+        return 'tiktoken', lambda text: len(encoding.encode(text))
+    except Exception:
+        return 'regex', lambda text: len(_WORD_RE.findall(text))
+
+
+def default_plan(question: str, warehouse_id: int = 1, unit_id: int = 1000) -> Plan:
+    """Tool calls a well-behaved model would make for the question"""
+    q = question.lower()
+    if 'unit' in q:
+        return [('warehouse_unit_list_summary', {'original_query': question, 'warehouse_id': warehouse_id})]
+    if any(word in q for word in ('sensor', 'door', 'temperature', 'status', 'value')):
+        return [
+            ('warehouse_sensor_summary', {'original_query': question, 'warehouse_id': warehouse_id}),
+            ('unit_sensor_summary', {'warehouse_id': warehouse_id, 'unit_id': unit_id}),
+        ]
+    return []
+
+
+def _action(action: str, action_input: Any) -> str:
+    return '```json\n%s\n```' % json.dumps({'action': action, 'action_input': action_input})
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that follows a fixed tool plan per question, in the chat agent's format"""
+
+    plans: Dict[str, Plan]
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'scripted'
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        text = messages[-1].content
+        if 'API_SCHEMA' in text:
+            # A tool asking for request arguments
+            return 'ARGS: ```json\n{"warehouse_id": 1}\n```'
+        if 'Progressively summarize' in text:
+            return 'The user asked about the Genesis fleet.'
+
+        # Which question this turn is about, and how many tools it has used so far
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], HumanMessage) and not messages[i].content.startswith('TOOL RESPONSE'):
+                question = next((q for q in self.plans if q in messages[i].content), None)
+                step = sum(1 for m in messages[i + 1:] if isinstance(m, HumanMessage))
+                break
+        else:
+            question, step = None, 0
+
+        plan = self.plans.get(question, [])
+        if step < len(plan):
+            tool, tool_input = plan[step]
+            return _action(tool, json.dumps(tool_input))
+        return _action('Final Answer', 'Here is what I found about "%s".' % question)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._respond(messages)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return self._generate(messages, stop=stop)
+
+
+class ReplayStats(BaseCallbackHandler):
+    """Counts LLM calls, tokens and tool calls of one run"""
+
+    def __init__(self, count_tokens: Callable[[str], int]):
+        self.count_tokens = count_tokens
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tools: List[str] = []
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], **kwargs: Any) -> None:
+        self.llm_calls += 1
+        self.prompt_tokens += sum(self.count_tokens(m.content) for batch in messages for m in batch)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self.llm_calls += 1
+        self.prompt_tokens += sum(self.count_tokens(p) for p in prompts)
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.completion_tokens += sum(self.count_tokens(g.text) for gens in response.generations for g in gens)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self.tools.append(serialized.get('name'))
+
+
+def replay(questions: List[str],
+           fleet: dict,
+           llm_latency: float = 0.0,
+           api_latency: float = 0.0,
+           plan: Callable[[str], Plan] = default_plan,
+           spec_file: str = 'genesis_openapi.yaml',
+           api_cache_ttl: float = 60.0) -> dict:
+    from genesis.chat_chain import agent_chain
+    from genesis.api_cache import ResponseCache
+    from genesis.spec_registry import get_spec_registry
+
+    tokenizer, count_tokens = _make_token_counter()
+    spec = get_spec_registry().from_file(spec_file)
+    api_requests: List[str] = []
+    requests = StandInRequests(
+        base_url=spec.base_url,
+        routes=GenesisFleetRoutes(fleet),
+        latency=api_latency,
+        on_request=api_requests.append,
+        # Its own, so runs don't share responses
+        cache=ResponseCache(ttl=api_cache_ttl),
+    )
+    llm = ScriptedChatModel(plans={q: plan(q) for q in questions}, latency=llm_latency)
+    agent = agent_chain(
+        llm,
+        llm_for_tool=llm,
+        requests=requests,
+        spec=spec,
+        verbose=False,
+        tool_verbose=False,
+        # Summarizing memory would need tiktoken's encodings, which may not be available offline
+        memory=ConversationBufferMemory(memory_key='chat_history', return_messages=True),
+    )
+
+    results = []
+    for question in questions:
+        stats = ReplayStats(count_tokens)
+        num_requests = len(api_requests)
+        start = time.perf_counter()
+        answer = agent.run(question, callbacks=[stats])
+        results.append({
+            'question': question,
+            'wall_seconds': time.perf_counter() - start,
+            'llm_calls': stats.llm_calls,
+            'tool_calls': len(stats.tools),
+            'tools': stats.tools,
+            'api_requests': len(api_requests) - num_requests,
+            'prompt_tokens': stats.prompt_tokens,
+            'completion_tokens': stats.completion_tokens,
+            'answer_chars': len(answer),
+        })
+
+    totals = {
+        key: sum(r[key] for r in results)
+        for key in ('wall_seconds', 'llm_calls', 'tool_calls', 'api_requests', 'prompt_tokens', 'completion_tokens')
+    }
+    return {'tokenizer': tokenizer, 'questions': results, 'totals': totals}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('questions', nargs='?', default='fail_input.txt', help='File with one question per line')
+    parser.add_argument('--warehouses', type=int, default=3)
+    parser.add_argument('--units', type=int, default=10, help='Units per warehouse')
+    parser.add_argument('--sensors', type=int, default=20, help='Sensors per unit')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Simulated seconds per LLM call')
+    parser.add_argument('--api-latency', type=float, default=0.0, help='Simulated seconds per Genesis request')
+    parser.add_argument('--spec', default='genesis_openapi.yaml', help='OpenAPI spec of the Genesis API')
+    parser.add_argument('--api-cache-ttl', type=float, default=60.0, help='Seconds Genesis responses are reused')
+    args = parser.parse_args()
+
+    with open(args.questions) as f:
+        questions = [line.strip() for line in f if line.strip()]
+
+    fleet = make_synthetic_fleet(args.warehouses, args.units, args.sensors)
+    report = replay(questions, fleet, llm_latency=args.llm_latency, api_latency=args.api_latency,
+                    spec_file=args.spec, api_cache_ttl=args.api_cache_ttl)
+    print(json.dumps(report, indent=2))
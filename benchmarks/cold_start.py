@@ -0,0 +1,64 @@
+"""Measure cold start (fresh interpreter import time) of each entry point.
+
+Usage: python -m benchmarks.cold_start [--repeat N] [module ...]
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+from typing import List
+
+
+ENTRY_POINTS = [
+    'doc_parse',
+    'doc_ingest',
+    'genesis_vecstore_save',
+    'genesis.chat_chain',
+    'langcorn_app',
+    'langchain_gradio',
+]
+
+_TIMER_SNIPPET = '''
+import time, importlib
+start = time.perf_counter()
+importlib.import_module(%r)
+print(time.perf_counter() - start)
+'''
+
+
+def time_import(module: str) -> float:
+    """Import `module` in a fresh interpreter and return the seconds it took"""
+    result = subprocess.run(
+        [sys.executable, '-c', _TIMER_SNIPPET % module],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'exit code %d' % result.returncode)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(modules: List[str], repeat: int = 3) -> dict:
+    report = {}
+    for module in modules:
+        try:
+            timings = [time_import(module) for _ in range(repeat)]
+            report[module] = {
+                'median_seconds': statistics.median(timings),
+                'min_seconds': min(timings),
+            }
+        except RuntimeError as e:
+            report[module] = {'error': str(e)}
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=ENTRY_POINTS)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(json.dumps(measure(args.modules, args.repeat), indent=2))
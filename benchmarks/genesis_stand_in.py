@@ -0,0 +1,108 @@
+"""In-process stand-in for the Genesis API, serving a synthetic fleet.
+
+`GenesisFleetRoutes` answers the endpoints of `genesis_openapi.yaml` from
+`make_synthetic_fleet` output, and `StandInRequests` plugs it into the agent
+tools in place of the HTTP client, so they run without a network. Its GETs go
+through a `ResponseCache` like in production, so only cache misses reach the
+stand-in.
+"""
+
+import re
+import json
+import time
+import asyncio
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from genesis.api_cache import CachedRequests, CachedResponse
+
+
+_ROUTES: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r'^/locations/?$'), 'locations'),
+    (re.compile(r'^/locations/(?P<warehouse_id>\d+)/summary/?$'), 'location_summary'),
+    (re.compile(r'^/metrics/warehouse/(?P<warehouse_id>\d+)/?$'), 'warehouse'),
+    (re.compile(r'^/metrics/warehouse/(?P<warehouse_id>\d+)/unit/(?P<unit_id>\d+)/?$'), 'unit'),
+    (re.compile(r'^/sensors/?$'), 'sensors'),
+]
+
+_NOT_FOUND = (404, {'detail': 'Not Found'})
+
+
+class GenesisFleetRoutes:
+    """Genesis API responses for a synthetic fleet, by path"""
+
+    def __init__(self, fleet: dict):
+        self.fleet = fleet
+        self._unit_warehouse = {
+            unit['Unit Id']: loc_id
+            for loc_id, warehouse in fleet['warehouses'].items()
+            for unit in warehouse['wv_unit_summary']
+        }
+        self._sensors: Optional[List[dict]] = None
+
+    def _sensor_list(self) -> List[dict]:
+        if self._sensors is None:
+            sensors = []
+            for unit_id, unit in self.fleet['units'].items():
+                for row in unit['uv_unit_metrics']:
+                    sensors.append({
+                        'sensor_id': row['Sensor Id'],
+                        'global_sensor_name': '%s_%s' % (row['Location Name'], row['Sensor Name'].replace(' ', '_')),
+                        'sensor_alias': row['Sensor Alias'],
+                        'sensor_type': row['Metric Type'],
+                        'metric_unit': row['Unit'],
+                        'unit_id': unit_id,
+                        'unit_alias': row['Unit Alias'],
+                    })
+            self._sensors = sensors
+        return self._sensors
+
+    def handle(self, path: str) -> Tuple[int, Any]:
+        """(status code, JSON body) for a GET of `path`"""
+        for pattern, route in _ROUTES:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            params = {k: int(v) for k, v in match.groupdict().items()}
+
+            if route == 'locations':
+                return 200, self.fleet['locations']
+            if route == 'sensors':
+                return 200, self._sensor_list()
+            if route == 'location_summary':
+                summary = self.fleet['location_summary'].get(params['warehouse_id'])
+                return (200, summary) if summary is not None else _NOT_FOUND
+            if route == 'warehouse':
+                warehouse = self.fleet['warehouses'].get(params['warehouse_id'])
+                return (200, warehouse) if warehouse is not None else _NOT_FOUND
+            if route == 'unit':
+                if self._unit_warehouse.get(params['unit_id']) != params['warehouse_id']:
+                    return _NOT_FOUND
+                return 200, self.fleet['units'][params['unit_id']]
+        return _NOT_FOUND
+
+
+class StandInRequests(CachedRequests):
+    """Requests whose GETs are answered by `GenesisFleetRoutes` in-process, through the response cache"""
+
+    base_url: str
+    routes: Any
+    latency: float = 0.0
+    on_request: Optional[Callable[[str], None]] = None
+
+    def _respond(self, url: str) -> CachedResponse:
+        if self.on_request is not None:
+            self.on_request(url)
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        status_code, body = self.routes.handle('/' + path.lstrip('/'))
+        return CachedResponse(status_code, 'OK' if status_code == 200 else 'Not Found', json.dumps(body), time.time())
+
+    def _fetch(self, url: str, **kwargs: Any) -> CachedResponse:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return self._respond(url)
+
+    async def _afetch(self, url: str, **kwargs: Any) -> CachedResponse:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self._respond(url)
@@ -0,0 +1,119 @@
+"""Run a local mock Genesis server with a synthetic fleet.
+
+A GET route is registered for every path of `genesis_openapi.yaml` and
+answered by `GenesisFleetRoutes` from a deterministic `make_synthetic_fleet`
+fleet of the given size. Each request can be delayed (`--latency`,
+`--jitter`) and made to fail (`--error-rate`).
+
+The spec itself is served at `/openapi.yaml`, with its server URL pointing at
+the mock. To run the agent tools against the mock, set
+`GENESIS_OPENAPI_FILE=http://127.0.0.1:8800/openapi.yaml`. To scrape it, run
+`python genesis_vecstore_save.py --base-url http://127.0.0.1:8800`.
+Request and error counts are at `/_mock/stats`.
+
+Usage: python -m benchmarks.mock_genesis_server [--warehouses N] [--units N] [--sensors N] [--latency S] [--error-rate P]
+"""
+
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+import yaml
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from .synthetic_fleet import make_synthetic_fleet, count_sensors
+from .genesis_stand_in import GenesisFleetRoutes
+
+
+def create_mock_app(fleet: dict,
+                    spec_path: str = 'genesis_openapi.yaml',
+                    latency: float = 0.0,
+                    jitter: float = 0.0,
+                    error_rate: float = 0.0,
+                    error_status: int = 503,
+                    seed: int = 0) -> FastAPI:
+    """FastAPI app serving `fleet` on the paths of the OpenAPI spec"""
+    with open(spec_path) as f:
+        spec = yaml.safe_load(f)
+
+    routes = GenesisFleetRoutes(fleet)
+    rng = random.Random(seed)
+    requests_by_route = Counter()
+    errors_by_route = Counter()
+
+    # FastAPI's own docs would shadow the Genesis spec
+    app = FastAPI(title='Mock Genesis', openapi_url=None, docs_url=None, redoc_url=None)
+
+    def add_route(path: str, operation: dict):
+        async def handler(request: Request):
+            requests_by_route[path] += 1
+            delay = latency + (rng.uniform(0, jitter) if jitter > 0 else 0.0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if error_rate > 0 and rng.random() < error_rate:
+                errors_by_route[path] += 1
+                return JSONResponse({'detail': 'Injected error'}, status_code=error_status)
+            status_code, body = routes.handle(path.format(**request.path_params))
+            return JSONResponse(body, status_code=status_code)
+
+        app.add_api_route(path, handler, methods=['GET'], name=operation.get('operationId'))
+
+    for path, path_item in spec.get('paths', {}).items():
+        if 'get' in path_item:
+            add_route(path, path_item['get'])
+
+    @app.get('/openapi.yaml', include_in_schema=False)
+    async def openapi_spec(request: Request):
+        mock_spec = dict(spec, servers=[{'url': str(request.base_url).rstrip('/')}])
+        return PlainTextResponse(yaml.safe_dump(mock_spec, sort_keys=False), media_type='application/yaml')
+
+    @app.get('/_mock/stats', include_in_schema=False)
+    async def mock_stats():
+        return {
+            'warehouses': len(fleet['locations']),
+            'units': len(fleet['units']),
+            'sensors': count_sensors(fleet),
+            'requests': sum(requests_by_route.values()),
+            'injected_errors': sum(errors_by_route.values()),
+            'requests_by_route': dict(requests_by_route),
+            'errors_by_route': dict(errors_by_route),
+        }
+
+    return app
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--warehouses', type=int, default=200)
+    parser.add_argument('--units', type=int, default=20, help='Units per warehouse')
+    parser.add_argument('--sensors', type=int, default=10, help='Sensors per unit')
+    parser.add_argument('--warehouse-sensors', type=int, default=10, help='Warehouse-level sensors per warehouse')
+    parser.add_argument('--seed', type=int, default=0, help='Same seed, same fleet')
+    parser.add_argument('--spec', default='genesis_openapi.yaml', help='OpenAPI spec whose paths are served')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many more seconds, at random')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=503, help='Status code of failed requests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    args = parser.parse_args()
+
+    fleet = make_synthetic_fleet(args.warehouses, args.units, args.sensors, args.warehouse_sensors, seed=args.seed)
+    print('Mock Genesis: %d warehouses, %d units, %d sensors' % (
+        len(fleet['locations']), len(fleet['units']), count_sensors(fleet)
+    ))
+    app = create_mock_app(
+        fleet,
+        spec_path=args.spec,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
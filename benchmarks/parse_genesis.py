@@ -0,0 +1,46 @@
+"""Benchmark `parse_genesis_apis` on a synthetic fleet.
+
+Usage: python -m benchmarks.parse_genesis [--warehouses N] [--units N] [--sensors N] [--validate]
+"""
+
+import time
+import json
+import argparse
+
+from .synthetic_fleet import make_synthetic_fleet, count_sensors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--warehouses', type=int, default=20)
+    parser.add_argument('--units', type=int, default=50, help='Units per warehouse')
+    parser.add_argument('--sensors', type=int, default=100, help='Sensors per unit')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--validate', action='store_true', help='Also time building the `Genesis` model')
+    args = parser.parse_args()
+
+    from genesis_vecstore_save import parse_genesis_apis, Genesis
+
+    fleet = make_synthetic_fleet(args.warehouses, args.units, args.sensors)
+    num_sensors = count_sensors(fleet)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        parsed = parse_genesis_apis(fleet)
+        timings.append(time.perf_counter() - start)
+
+    report = {
+        'warehouses': args.warehouses,
+        'units': args.warehouses * args.units,
+        'sensors': num_sensors,
+        'parse_seconds': min(timings),
+        'sensors_per_second': num_sensors / min(timings),
+    }
+
+    if args.validate:
+        start = time.perf_counter()
+        Genesis.parse_obj(parsed)
+        report['validate_seconds'] = time.perf_counter() - start
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,69 @@
+"""Micro-benchmark of the sensor table renderer used by the Genesis tools.
+
+Usage: python -m benchmarks.render_tables [--rows N] [--repeat N]
+"""
+
+import time
+import json
+import argparse
+
+import pandas as pd
+
+from genesis.genesis_api.render import render_sensor_table
+
+from .synthetic_fleet import make_synthetic_fleet
+
+
+def legacy_render_sensor_table(rows) -> str:
+    """The DataFrame/groupby/iterrows renderer the tools used before, for comparison"""
+    response_text_summary = '# Warehouse level sensors\n'
+    df = pd.DataFrame(rows)
+    response_text_summary += "Level info: ## is Sensor type, ### is Sensor subtype\n"
+    response_text_summary += "Sensor data format: Sensor ID // Name // Value // Status\n"
+    for metric_type_name, df_mt in df.groupby('Metric Type'):
+        response_text_summary += "## %s\n" % metric_type_name
+        for metric_subtype_name, df_mst in df_mt.groupby('Metric Sub-Type'):
+            response_text_summary += "### %s\n" % metric_subtype_name
+            for lbl, sensor_row in df_mst.iterrows():
+                val = sensor_row['Value'] or ''
+                if sensor_row['Unit'] is not None:
+                    val += ' ' + sensor_row['Unit']
+                if sensor_row['Value Duration Minutes'] is not None:
+                    val += '(for %s)' % sensor_row['Value Duration Minutes']
+                response_text_summary += '{} // {} // {} // {}\n'.format(
+                    sensor_row['Sensor Id'], sensor_row['Sensor Name'], val, sensor_row['State'])
+    return response_text_summary
+
+
+def _best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    fleet = make_synthetic_fleet(num_warehouses=1, units_per_warehouse=0, sensors_per_unit=0, warehouse_sensors=args.rows)
+    rows = fleet['warehouses'][1]['wv_warehouse_metrics']
+    # The legacy renderer can only concatenate strings, and pandas turns None into NaN
+    rows = [{**row,
+             'Value': str(row['Value']),
+             'Unit': row['Unit'] or '-',
+             'Value Duration Minutes': str(row['Value Duration Minutes'] or 0)}
+            for row in rows]
+
+    report = {
+        'rows': len(rows),
+        'render_seconds': _best_of(args.repeat, render_sensor_table, 'Warehouse level sensors', rows),
+        'render_projected_seconds': _best_of(args.repeat, render_sensor_table, 'Warehouse level sensors', rows, ['Sensor Name', 'State']),
+        'legacy_render_seconds': _best_of(args.repeat, legacy_render_sensor_table, rows),
+    }
+    report['speedup'] = report['legacy_render_seconds'] / report['render_seconds']
+    print(json.dumps(report, indent=2))
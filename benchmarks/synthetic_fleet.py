@@ -0,0 +1,133 @@
+"""Deterministic synthetic Genesis fleets, shaped like `scrape_all_genesis` output"""
+
+import random
+
+from typing import List, Tuple, Optional
+
+
+STATES = ['NORMAL', 'OUT_OF_RANGE', 'INACTIVE']
+STATE_WEIGHTS = [0.85, 0.1, 0.05]
+
+# (Metric Type, Metric Sub-Type, Unit)
+METRIC_KINDS: List[Tuple[str, str, Optional[str]]] = [
+    ('Temperature', 'Temp', 'Celsius'),
+    ('Humidity', 'RH', '%'),
+    ('Power - EM', 'KWH', 'KWH'),
+    ('Fire', 'VESDA', None),
+    ('Door', 'Open/Close', None),
+]
+
+
+def _sensor_value(rng: random.Random, metric_type: str):
+    if metric_type == 'Door':
+        return rng.choice(['Open', 'Closed'])
+    if metric_type == 'Fire':
+        return rng.choice(['0', '1'])
+    return round(rng.uniform(10, 90), 2)
+
+
+def _sensor_row(rng: random.Random, sensor_id: int, name_prefix: str) -> dict:
+    metric_type, metric_subtype, measure_unit = METRIC_KINDS[sensor_id % len(METRIC_KINDS)]
+    state = rng.choices(STATES, STATE_WEIGHTS)[0]
+    return {
+        'Metric Type': metric_type,
+        'Metric Sub-Type': metric_subtype,
+        'Percentage': None,
+        'Sensor Id': sensor_id,
+        'Sensor Name': '%s %s %d' % (name_prefix, metric_subtype, sensor_id),
+        'State': state,
+        'Threshold crosses': rng.randint(0, 5) if state != 'NORMAL' else None,
+        'Unit': measure_unit,
+        'Value': _sensor_value(rng, metric_type),
+        'Value Duration Minutes': rng.randint(1, 600) if state != 'NORMAL' else None,
+    }
+
+
+def make_synthetic_fleet(num_warehouses: int = 10,
+                         units_per_warehouse: int = 20,
+                         sensors_per_unit: int = 50,
+                         warehouse_sensors: int = 10,
+                         seed: int = 0) -> dict:
+    """Build raw API responses for a fleet of the given size. Same seed, same fleet."""
+    rng = random.Random(seed)
+    raw_responses = {
+        'locations': [],
+        'location_summary': {},
+        'warehouses': {},
+        'units': {},
+    }
+
+    next_unit_id = 1000
+    next_sensor_id = 100000
+
+    for w in range(num_warehouses):
+        loc_id = w + 1
+        loc_name = 'SYN_W%d' % loc_id
+        loc_alias = 'Synthetic %d' % loc_id
+
+        warlvl_sensors = []
+        for _ in range(warehouse_sensors):
+            row = _sensor_row(rng, next_sensor_id, 'WH')
+            row.update({'Block': 'WH', 'Location Id': str(loc_id)})
+            warlvl_sensors.append(row)
+            next_sensor_id += 1
+
+        unit_summary = []
+        for u in range(units_per_warehouse):
+            unit_id = next_unit_id
+            next_unit_id += 1
+            unit_name = 'B%d Unit %d' % (u // 10 + 1, u + 1)
+            unit_alias = 'B%d U%d' % (u // 10 + 1, u + 1)
+
+            unit_sensors = []
+            for _ in range(sensors_per_unit):
+                row = _sensor_row(rng, next_sensor_id, unit_alias)
+                row.update({
+                    'Location Alias': loc_alias,
+                    'Location Name': loc_name,
+                    'Sensor Alias': row['Sensor Name'],
+                    'Unit Alias': unit_alias,
+                    'Unit Name': unit_name,
+                })
+                unit_sensors.append(row)
+                next_sensor_id += 1
+
+            num_out = sum(1 for row in unit_sensors if row['State'] == 'OUT_OF_RANGE')
+            unit_summary.append({
+                'Block': 'B%d' % (u // 10 + 1),
+                'Location Id': str(loc_id),
+                'Location Alias': loc_alias,
+                'Location Name': loc_name,
+                'State': 'OUT_OF_RANGE' if num_out > 0 else 'NORMAL',
+                'Unit Alias': unit_alias,
+                'Unit Id': unit_id,
+                'Unit Name': unit_name,
+                'Value': num_out,
+            })
+            raw_responses['units'][unit_id] = {'uv_unit_metrics': unit_sensors}
+
+        num_out = sum(1 for unit in unit_summary if unit['State'] != 'NORMAL')
+        raw_responses['locations'].append({
+            'id': loc_id,
+            'latitude': round(rng.uniform(-60, 60), 4),
+            'longitude': round(rng.uniform(-180, 180), 4),
+            'name': loc_name,
+            'state': 'OUT_OF_RANGE' if num_out > 0 else 'NORMAL',
+        })
+        raw_responses['location_summary'][loc_id] = {
+            'metrics': {'value': num_out, 'state': 'OUT_OF_RANGE' if num_out > 0 else 'NORMAL'},
+            'power': {'value': round(rng.uniform(1000, 20000), 1), 'state': 'NORMAL', 'unit': 'KWH'},
+            'attendance': {'value': rng.randint(0, 50), 'state': 'NORMAL'},
+            'emergencies': {'value': 0, 'state': 'NORMAL'},
+        }
+        raw_responses['warehouses'][loc_id] = {
+            'wv_warehouse_metrics': warlvl_sensors,
+            'wv_unit_summary': unit_summary,
+        }
+
+    return raw_responses
+
+
+def count_sensors(raw_responses: dict) -> int:
+    return sum(len(w['wv_warehouse_metrics']) for w in raw_responses['warehouses'].values()) \
+        + sum(len(u['uv_unit_metrics']) for u in raw_responses['units'].values())
@@ -1,15 +1,21 @@
 
 import os
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
 from typing import IO
 from tempfile import _TemporaryFileWrapper
 
 from vectorstores.hf_embedding import text_doc_splitter
+from vectorstores.bulk import add_embedded_documents, get_embedding_function
 
 from langchain.document_loaders import UnstructuredFileIOLoader
 from langchain.vectorstores.base import VectorStore
 from langchain.schema import Document
 
-from typing import List
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 
 class UnstructuredFileIOMetadataLoader(UnstructuredFileIOLoader):
@@ -22,6 +28,19 @@ SPLIT_CHUNK_SIZE = 300
 SPLIT_CHUNK_OVERLAP = 20
 """How many characters between two chunks are same"""
 
+INGEST_PARSE_WORKERS = os.cpu_count() or 1
+"""Processes parsing files at once"""
+INGEST_EMBED_BATCH_SIZE = 256
+"""Chunks embedded (and written) together, across files"""
+INGEST_QUEUE_BATCHES = 4
+"""Batches waiting between two stages before the earlier one waits"""
+INGEST_PDF_PAGES_PER_PART = 16
+"""Pages of a PDF parsed together, so no process ever holds a whole large document"""
+INGEST_TEXT_BYTES_PER_PART = 1024 * 1024
+"""Bytes of a text file parsed together"""
+
+TEXT_FILE_EXTENSIONS = ('.txt', '.md', '.log')
+
 
 def dump_documents_to_db(store: VectorStore, documents: List[Document]) -> int:
     # Split document into chunks (with some overlapping content)
@@ -41,9 +60,393 @@ def handle_document(store: VectorStore, file: IO) -> int:
         pass
 
 
-def upload_files(store: VectorStore, *files: _TemporaryFileWrapper):
-    for file in files:
-        with open(file.name, 'rb') as f:
-            print("Uploading file %s..." % file.name)
-            num_document_chunks = handle_document(store, f)
-            print("%s uploaded, %d chunks" % (file.name, num_document_chunks))
+class FilePart(NamedTuple):
+    """A range of a file parsed on its own: pages of a PDF, bytes of a text file or else the whole file"""
+    path: str
+    kind: str
+    start: int = 0
+    stop: Optional[int] = None
+
+    def describe(self) -> str:
+        if self.kind == 'pdf':
+            return "pages %d-%d" % (self.start + 1, self.stop)
+        if self.kind == 'text':
+            return "bytes %d-%d" % (self.start, self.stop)
+        return "whole file"
+
+
+class IngestProgress(NamedTuple):
+    parts_done: int
+    parts_total: int
+    chunks_written: int
+
+
+def count_pdf_pages(path: str) -> int:
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+
+    with open(path, 'rb') as f:
+        # From the page tree root, without parsing any page
+        return int(resolve1(PDFDocument(PDFParser(f)).catalog['Pages'])['Count'])
+
+
+def split_file(path: str) -> List[FilePart]:
+    """Ranges of the file to parse, each small enough to hold in memory"""
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == '.pdf':
+            pages, step, kind = count_pdf_pages(path), INGEST_PDF_PAGES_PER_PART, 'pdf'
+            if pages <= step:
+                # Small enough for Unstructured to lay out (and OCR) in one go
+                return [FilePart(path, 'file')]
+        elif extension in TEXT_FILE_EXTENSIONS:
+            pages, step, kind = os.path.getsize(path), INGEST_TEXT_BYTES_PER_PART, 'text'
+            if pages <= step:
+                # Small enough for Unstructured to split into titles, lists, etc.
+                return [FilePart(path, 'file')]
+        else:
+            return [FilePart(path, 'file')]
+    except Exception as e:
+        # Let the loader have a go at it (and report what's wrong)
+        print("%s can't be split, parsing it whole: %r" % (path, e))
+        return [FilePart(path, 'file')]
+    return [FilePart(path, kind, start, min(start + step, pages)) for start in range(0, pages, step)]
+
+
+def ocr_pdf_page(path: str, number: int) -> str:
+    """Text of a PDF page without a text layer (eg: scanned), read by Unstructured from its image"""
+    import io
+    from pdf2image import convert_from_path
+    from unstructured.partition.image import partition_image
+
+    texts = []
+    for image in convert_from_path(path, first_page=number, last_page=number):
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        buffer.seek(0)
+        texts.extend(str(element).strip() for element in partition_image(file=buffer))
+    return '\n\n'.join(filter(None, texts))
+
+
+def iter_pdf_pages(path: str, start: int, stop: int) -> Iterator[Document]:
+    """Pages `start` to `stop` of a PDF, laid out one at a time.
+
+    Pages with images but no text are OCRed, one page at a time as well. A page
+    that can't be OCRed (eg: poppler or tesseract isn't installed) is skipped.
+    """
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTFigure, LTImage, LTTextContainer
+
+    source = os.path.basename(path)
+    with open(path, 'rb') as f:
+        pages = extract_pages(f, page_numbers=range(start, stop), maxpages=stop)
+        for number, page in enumerate(pages, start + 1):
+            texts = [element.get_text().strip() for element in page if isinstance(element, LTTextContainer)]
+            text = '\n\n'.join(filter(None, texts))
+            if not text and any(isinstance(element, (LTFigure, LTImage)) for element in page):
+                try:
+                    text = ocr_pdf_page(path, number)
+                except Exception as e:
+                    print("%s page %d has no text and can't be OCRed, skipping it: %r" % (path, number, e))
+            if text:
+                yield Document(page_content=text, metadata={'source': source, 'page': number})
+
+
+def read_text_part(path: str, start: int, stop: int) -> Document:
+    """The lines of a text file starting between bytes `start` and `stop`"""
+    with open(path, 'rb') as f:
+        if start > 0:
+            # The line running into the part belongs to the previous one
+            f.seek(start - 1)
+            f.readline()
+        lines = []
+        while f.tell() < stop:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line)
+    return Document(page_content=b''.join(lines).decode('utf-8', errors='replace'),
+                    metadata={'source': os.path.basename(path)})
+
+
+def iter_part_documents(part: FilePart) -> Iterator[Document]:
+    if part.kind == 'pdf':
+        yield from iter_pdf_pages(part.path, part.start, part.stop)
+    elif part.kind == 'text':
+        yield read_text_part(part.path, part.start, part.stop)
+    else:
+        with open(part.path, 'rb') as f:
+            loader = UnstructuredFileIOMetadataLoader(f, metadata_filename=os.path.basename(part.path))
+            yield from loader.load()
+
+
+def iter_chunks(documents: Iterable[Document]) -> Iterator[Document]:
+    """Split documents into chunks as they come, holding the chunks of one document at most"""
+    for document in documents:
+        yield from text_doc_splitter.split_documents([document])
+
+
+def parse_part(part: FilePart) -> List[Document]:
+    """Load and split one part of a file into chunks"""
+    return list(iter_chunks(iter_part_documents(part)))
+
+
+def parse_file(path: str) -> List[Document]:
+    """Load and split one file into chunks"""
+    return [chunk for part in split_file(path) for chunk in parse_part(part)]
+
+
+def _timed_parse_part(part: FilePart) -> Tuple[List[Document], float]:
+    # Runs in the parser processes
+    started = time.perf_counter()
+    chunks = parse_part(part)
+    return chunks, time.perf_counter() - started
+
+
+class StageStats:
+    """Items through a pipeline stage and the time it spent working on them"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def add(self, items: int, seconds: float):
+        self.items += items
+        self.busy_seconds += seconds
+
+    def report(self, wall_seconds: float) -> dict:
+        return {
+            'items': self.items,
+            'busy_seconds': self.busy_seconds,
+            'items_per_second': self.items / wall_seconds if wall_seconds > 0 else 0.0,
+        }
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all uploads, started on first use"""
+    global _parse_pool
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                # Not forked: the parent may hold the embedding model and its threads
+                _parse_pool = ProcessPoolExecutor(INGEST_PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _parse_pool
+
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    # Wait for room in the next stage, unless the pipeline is being torn down
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+class IngestPipeline:
+    """Parse files in processes, embed chunks in batches across files and write them in bulk, all at once.
+
+    Files are parsed in parts (see `split_file`), so a large document is
+    never held whole by any process. Parsed parts flow to the embedding
+    thread, and embedded batches to the writer (the calling thread), through
+    bounded queues. A slow stage holds back the earlier ones instead of piling
+    up chunks in memory: memory use depends on the part and batch sizes, not
+    on the size of the files.
+    """
+
+    def __init__(self,
+                 store: VectorStore,
+                 parse_pool: Optional[Executor] = None,
+                 parse_workers: int = INGEST_PARSE_WORKERS,
+                 batch_size: int = INGEST_EMBED_BATCH_SIZE,
+                 queue_batches: int = INGEST_QUEUE_BATCHES,
+                 progress: Optional[Callable[[IngestProgress], None]] = None):
+        self.store = store
+        self.parse_pool = parse_pool
+        self.parse_workers = parse_workers
+        self.batch_size = batch_size
+        self.queue_batches = queue_batches
+        self.progress = progress
+
+        self.parse_stats = StageStats('parse')
+        self.embed_stats = StageStats('embed')
+        self.write_stats = StageStats('write')
+        self.chunks_per_file: Dict[str, int] = {}
+        self.parts_per_file: Dict[str, int] = {}
+        self.failed_parts: Dict[str, List[str]] = {}
+        self.parts_total = 0
+        self.parts_done = 0
+
+    def _parse(self, parts: List[FilePart], parsed: queue.Queue, stop: threading.Event):
+        pool = self.parse_pool or get_parse_pool()
+        remaining = iter(parts)
+        pending: Dict[Future, FilePart] = {}
+
+        def submit_more():
+            # Only as many parts as there are parsers, the rest wait for the embedder to catch up
+            while len(pending) < self.parse_workers:
+                part = next(remaining, None)
+                if part is None:
+                    return
+                pending[pool.submit(_timed_parse_part, part)] = part
+
+        try:
+            submit_more()
+            while len(pending) > 0 and not stop.is_set():
+                done, _ = wait(pending, timeout=_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    part = pending.pop(future)
+                    self.parts_done += 1
+                    try:
+                        chunks, seconds = future.result()
+                    except Exception as e:
+                        # The other parts of the file are still written, the report tells it's partial
+                        self.failed_parts.setdefault(part.path, []).append("%s: %r" % (part.describe(), e))
+                        print("%s (%s) failed to parse: %r" % (part.path, part.describe(), e))
+                        continue
+                    self.chunks_per_file[part.path] += len(chunks)
+                    self.parse_stats.add(1, seconds)
+                    _put(parsed, chunks, stop)
+                submit_more()
+        finally:
+            for future in pending:
+                future.cancel()
+            _put(parsed, _DONE, stop)
+
+    def _embed(self, parsed: queue.Queue, embedded: queue.Queue, stop: threading.Event, errors: List[BaseException]):
+        embeddings = get_embedding_function(self.store)
+
+        def flush(batch: List[Document]):
+            started = time.perf_counter()
+            vectors = embeddings.embed_documents([doc.page_content for doc in batch]) if embeddings is not None else None
+            self.embed_stats.add(len(batch), time.perf_counter() - started)
+            _put(embedded, (batch, vectors), stop)
+
+        try:
+            batch: List[Document] = []
+            while True:
+                chunks = _get(parsed, stop)
+                if chunks is _DONE:
+                    break
+                batch.extend(chunks)
+                while len(batch) >= self.batch_size:
+                    flush(batch[:self.batch_size])
+                    batch = batch[self.batch_size:]
+            if len(batch) > 0 and not stop.is_set():
+                flush(batch)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(embedded, _DONE, stop)
+
+    def _report_progress(self):
+        if self.progress is not None:
+            self.progress(IngestProgress(self.parts_done, self.parts_total, self.write_stats.items))
+
+    def run(self, paths: List[str]) -> dict:
+        """Ingest the files. Returns the chunks per file, failed and partial files and throughput of each stage"""
+        started = time.perf_counter()
+        parts = [part for path in paths for part in split_file(path)]
+        self.parts_total = len(parts)
+        self.chunks_per_file = {path: 0 for path in paths}
+        self.parts_per_file = {path: 0 for path in paths}
+        for part in parts:
+            self.parts_per_file[part.path] += 1
+        parsed = queue.Queue(self.queue_batches)
+        embedded = queue.Queue(self.queue_batches)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+
+        parser = threading.Thread(target=self._parse, args=(parts, parsed, stop), name='ingest-parse', daemon=True)
+        embedder = threading.Thread(target=self._embed, args=(parsed, embedded, stop, errors), name='ingest-embed', daemon=True)
+        parser.start()
+        embedder.start()
+
+        try:
+            while True:
+                item = _get(embedded, stop)
+                if item is _DONE:
+                    break
+                batch, vectors = item
+                write_started = time.perf_counter()
+                if vectors is None:
+                    self.store.add_documents(batch)
+                else:
+                    add_embedded_documents(self.store, batch, vectors)
+                self.write_stats.add(len(batch), time.perf_counter() - write_started)
+                self._report_progress()
+        finally:
+            # Also tears down the other stages if writing failed
+            stop.set()
+            parser.join()
+            embedder.join()
+
+        if errors:
+            raise errors[0]
+        if hasattr(self.store, 'persist'):
+            self.store.persist()
+        self._report_progress()
+
+        # Failed: nothing of the file was written. Partial: some of its parts are missing
+        failed_files: Dict[str, str] = {}
+        partial_files: Dict[str, List[str]] = {}
+        for path, chunks in self.chunks_per_file.items():
+            failed_parts = self.failed_parts.get(path, [])
+            if len(failed_parts) == self.parts_per_file[path] and failed_parts:
+                failed_files[path] = '; '.join(failed_parts)
+            elif chunks == 0:
+                failed_files[path] = "No text found"
+            elif failed_parts:
+                partial_files[path] = failed_parts
+
+        wall_seconds = time.perf_counter() - started
+        return {
+            'chunks_per_file': self.chunks_per_file,
+            'failed_files': failed_files,
+            'partial_files': partial_files,
+            'wall_seconds': wall_seconds,
+            'stages': {
+                stage.name: stage.report(wall_seconds)
+                for stage in (self.parse_stats, self.embed_stats, self.write_stats)
+            },
+        }
+
+
+def print_progress(progress: IngestProgress):
+    print("%d/%d parts parsed, %d chunks written" % progress)
+
+
+def upload_files(store: VectorStore, *files: _TemporaryFileWrapper,
+                 progress: Callable[[IngestProgress], None] = print_progress) -> dict:
+    print("Uploading %d files..." % len(files))
+    report = IngestPipeline(store, progress=progress).run([file.name for file in files])
+    for path, num_document_chunks in report['chunks_per_file'].items():
+        if path in report['failed_files']:
+            print("%s not uploaded: %s" % (path, report['failed_files'][path]))
+        elif path in report['partial_files']:
+            print("%s partially uploaded, %d chunks, missing %s" % (path, num_document_chunks, '; '.join(report['partial_files'][path])))
+        else:
+            print("%s uploaded, %d chunks" % (path, num_document_chunks))
+    for stage, stats in report['stages'].items():
+        print("%s: %d items in %.2fs busy, %.1f/s overall" % (stage, stats['items'], stats['busy_seconds'], stats['items_per_second']))
+    return report
@@ -1,6 +1,7 @@
 
 from functools import partial
 
+from langchain.base_language import BaseLanguageModel
 from langchain.chains import RetrievalQAWithSourcesChain, RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain.agents.agent_toolkits import (
@@ -8,9 +9,13 @@ from langchain.agents.agent_toolkits import (
     VectorStoreToolkit,
     VectorStoreInfo,
 )
+from langchain.schema import BaseRetriever
 
-from vectorstores.doc_chroma import chromadb
-from vectorstores.genesis_pg import genesisdb
+from typing import Optional
+
+from vectorstores.registry import get_vectorstore
+from genesis.answer_cache import CachedAnswerChain, get_answer_cache
+from genesis.config import get_answer_cache_max_age
 
 
 combine_prompt_template = """Given the following extracted parts of a long document of json format and a question, create a final answer with references ("SOURCES"). 
@@ -54,21 +59,43 @@ ask_genesis_chain = partial(RetrievalQAWithSourcesChain.from_chain_type,
 )
 
 
-docs_vectorstore_info = VectorStoreInfo(
-    name="uploaded_docs",
-    description="Documents uploaded by the user",
-    vectorstore=chromadb,
-)
+def answer_cache_scope(name: str, llm: BaseLanguageModel, retriever: Optional[BaseRetriever] = None) -> str:
+    """Cache scope of a chain: answers differ with the model and the store it retrieves from"""
+    scope = [name, llm._llm_type, str(getattr(llm, 'model_name', None) or getattr(llm, 'model', None))]
+    store = getattr(retriever, 'vectorstore', None)
+    if store is not None:
+        collection = getattr(store, 'collection_name', None) or getattr(getattr(store, '_collection', None), 'name', None)
+        scope += [type(store).__name__, str(collection)]
+    return ':'.join(scope)
 
-genesis_vectorstore_info = VectorStoreInfo(
-    name="genesis",
-    description="Data of the Genesis server of warehouses, units, sensors and reports",
-    vectorstore=genesisdb,
-)
+
+def cached_ask_genesis_chain(llm: BaseLanguageModel, retriever: BaseRetriever, **kwargs) -> CachedAnswerChain:
+    """`ask_genesis_chain` behind the shared answer cache, invalidated when the Genesis data is saved again"""
+    return CachedAnswerChain(
+        chain=ask_genesis_chain(llm=llm, retriever=retriever, **kwargs),
+        cache=get_answer_cache(),
+        scope=answer_cache_scope('ask_genesis_chain', llm, retriever),
+        max_age=get_answer_cache_max_age()
+    )
+
+
+def get_docs_vectorstore_info() -> VectorStoreInfo:
+    return VectorStoreInfo(
+        name="uploaded_docs",
+        description="Documents uploaded by the user",
+        vectorstore=get_vectorstore("chromadb"),
+    )
+
+def get_genesis_vectorstore_info() -> VectorStoreInfo:
+    return VectorStoreInfo(
+        name="genesis",
+        description="Data of the Genesis server of warehouses, units, sensors and reports",
+        vectorstore=get_vectorstore("genesisdb"),
+    )
 
 def vectorstore_agent(llm):
     toolkit = VectorStoreToolkit(
-        vectorstore_info=genesis_vectorstore_info,
+        vectorstore_info=get_genesis_vectorstore_info(),
         # llm=llm
     )
     return create_vectorstore_agent(
@@ -0,0 +1,178 @@
+"""Per-session Genesis agents that share one set of tools.
+
+Building the agent means parsing the OpenAPI spec, creating every tool chain
+and the LLM clients, none of which depend on the conversation. The pool builds
+that once and gives each session its own `AgentExecutor` around the shared
+agent and tools, with only the memory being new. Sessions are evicted when
+idle for longer than the TTL, or least-recently-used first when the pool is
+full.
+"""
+
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+from langchain.agents import AgentExecutor
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.chains.base import Chain
+from langchain.schema import BaseMemory
+
+from typing import Any, Callable, Dict, List, Optional
+
+from .answer_cache import AnswerCache, CachedAnswerChain, get_answer_cache
+from .config import get_agent_pool_max_sessions, get_agent_pool_session_ttl, get_answer_cache_enabled, get_api_cache_ttl
+
+
+class _Session:
+    __slots__ = ('executor', 'chain', 'lock', '_alock')
+
+    def __init__(self, executor: AgentExecutor, chain: Chain):
+        self.executor = executor
+        # The executor, or the answer cache in front of it
+        self.chain = chain
+        self.lock = threading.Lock()
+        self._alock: Optional[asyncio.Lock] = None
+
+    @property
+    def alock(self) -> asyncio.Lock:
+        # Made on first async use, on Python < 3.10 locks bind to the loop they're made in
+        if self._alock is None:
+            self._alock = asyncio.Lock()
+        return self._alock
+
+
+class AgentPool:
+    """Session-keyed agents built from a template executor"""
+
+    def __init__(self,
+                 template: AgentExecutor,
+                 memory_factory: Callable[[], BaseMemory],
+                 max_sessions: int = 256,
+                 session_ttl: float = 1800.0,
+                 answer_cache: Optional[AnswerCache] = None,
+                 answer_max_age: Optional[float] = None,
+                 callbacks: Optional[List[BaseCallbackHandler]] = None):
+        self.template = template
+        self.memory_factory = memory_factory
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.answer_cache = answer_cache
+        self.answer_max_age = answer_max_age
+        # Passed down to every chain, tool and LLM call of every run
+        self.callbacks = callbacks or []
+
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+        self._sessions: 'OrderedDict[str, _Session]' = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self) -> _Session:
+        executor = AgentExecutor.from_agent_and_tools(
+            agent=self.template.agent,
+            tools=self.template.tools,
+            memory=self.memory_factory(),
+            verbose=self.template.verbose,
+            callbacks=self.template.callbacks,
+            max_iterations=self.template.max_iterations,
+            early_stopping_method=self.template.early_stopping_method,
+            handle_parsing_errors=self.template.handle_parsing_errors,
+        )
+        if self.answer_cache is None:
+            return _Session(executor, executor)
+        return _Session(executor, CachedAnswerChain(
+            chain=executor,
+            cache=self.answer_cache,
+            scope='genesis_agent',
+            max_age=self.answer_max_age
+        ))
+
+    def _evict(self, now: float):
+        for session_id in [s for s, t in self._last_used.items() if now - t >= self.session_ttl]:
+            del self._sessions[session_id]
+            del self._last_used[session_id]
+            self.evicted_idle += 1
+        while len(self._sessions) > self.max_sessions:
+            session_id, _ = self._sessions.popitem(last=False)
+            del self._last_used[session_id]
+            self.evicted_lru += 1
+
+    def _checkout(self, session_id: str) -> _Session:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and now - self._last_used[session_id] >= self.session_ttl:
+                session = None
+            if session is None:
+                session = self._new_session()
+                self.created += 1
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            self._last_used[session_id] = now
+            self._evict(now)
+        return session
+
+    def get(self, session_id: str) -> AgentExecutor:
+        """The session's agent, created if it doesn't exist or has expired"""
+        return self._checkout(session_id).executor
+
+    def _with_callbacks(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if self.callbacks:
+            kwargs['callbacks'] = [*self.callbacks, *(kwargs.get('callbacks') or [])]
+        return kwargs
+
+    def run(self, session_id: str, input: str, **kwargs: Any) -> str:
+        """Run the session's agent. Turns of the same session run one at a time"""
+        session = self._checkout(session_id)
+        with session.lock:
+            return session.chain.run(input, **self._with_callbacks(kwargs))
+
+    async def arun(self, session_id: str, input: str, **kwargs: Any) -> str:
+        """Async `run`, for serving many sessions from one event loop"""
+        session = self._checkout(session_id)
+        async with session.alock:
+            return await session.chain.arun(input, **self._with_callbacks(kwargs))
+
+    def drop(self, session_id: str) -> bool:
+        """Forget a session. Returns whether it existed"""
+        with self._lock:
+            self._last_used.pop(session_id, None)
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.time()
+            idle = [now - t for t in self._last_used.values()]
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'session_ttl': self.session_ttl,
+                'created': self.created,
+                'evicted_idle': self.evicted_idle,
+                'evicted_lru': self.evicted_lru,
+                'oldest_idle_seconds': max(idle) if idle else 0.0,
+            }
+
+
+def get_genesis_agent_pool(template: AgentExecutor,
+                           memory_factory: Callable[[], BaseMemory],
+                           max_sessions: Optional[int] = None,
+                           session_ttl: Optional[float] = None,
+                           callbacks: Optional[List[BaseCallbackHandler]] = None) -> AgentPool:
+    """Agent pool sized from the Genesis settings, with the shared answer cache if enabled"""
+    return AgentPool(
+        template,
+        memory_factory,
+        max_sessions=max_sessions if max_sessions is not None else get_agent_pool_max_sessions(),
+        session_ttl=session_ttl if session_ttl is not None else get_agent_pool_session_ttl(),
+        answer_cache=get_answer_cache() if get_answer_cache_enabled() else None,
+        # Answers are no fresher than the API responses they were built from
+        answer_max_age=get_api_cache_ttl(),
+        callbacks=callbacks,
+    )
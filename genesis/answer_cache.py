@@ -0,0 +1,362 @@
+"""Semantic cache of final answers, in front of agents and retrieval chains.
+
+Users ask the same few questions over and over ("how many warehouses are
+there?"), and each one is a full multi-step agent run. Answers are cached per
+scope (which chain answered, never which session), and looked up first by the
+normalized question text, then by cosine similarity of the question embeddings.
+
+An answer is reused only while the data it was built from is still current:
+it is dropped once the Genesis snapshot is newer than the answer or it is
+older than `max_age`. Questions that refer back to the conversation ("how many
+sensors are out_of_range in that?") are never cached, and neither are answers
+that don't answer ("I don't know").
+
+The embedding model barely tells "unit B1" from "unit B2", so a similar
+question is only reused when it names the same numbers and entities as the
+cached one (see `question_parameters`).
+"""
+
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from langchain.chains.base import Chain
+from langchain.embeddings.base import Embeddings
+from langchain.callbacks.manager import AsyncCallbackManagerForChainRun, CallbackManagerForChainRun
+
+from typing import Any, Callable, Deque, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from .config import get_answer_cache_min_similarity, get_answer_cache_max_entries
+
+
+GENESIS_SNAPSHOT_MARKER = '.cache/genesis_snapshot'
+"""Touched by `genesis_vecstore_save` whenever the Genesis data is saved"""
+
+NEAR_MISS_MARGIN = 0.1
+"""Misses within this much of the similarity threshold are kept for tuning"""
+
+_REFERENCE_RE = re.compile(
+    r"\b(that|this|those|these|it|its|them|they|their|above|previous|same|former|latter|again|also|else)\b",
+    re.IGNORECASE
+)
+_SPACE_RE = re.compile(r'\s+')
+_QUOTED_RE = re.compile(r'"([^"]+)"|\'([^\']+)\'')
+_WORD_RE = re.compile(r"[\w\-./]+")
+_UNANSWERED_RE = re.compile(
+    r"\b(i don't know|i do not know|i'm not sure|i am not sure|i cannot answer|i can't answer|"
+    r"agent stopped due to|an error occurred|something went wrong)\b",
+    re.IGNORECASE
+)
+
+
+def mark_genesis_snapshot(path: str = GENESIS_SNAPSHOT_MARKER):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        f.write('%f\n' % time.time())
+
+
+def get_genesis_snapshot_timestamp(path: str = GENESIS_SNAPSHOT_MARKER) -> float:
+    """When the Genesis data was last saved, or 0 if never"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def normalize_question(question: str) -> str:
+    return _SPACE_RE.sub(' ', question.strip().lower()).rstrip('?!. ')
+
+
+def is_standalone(question: str) -> bool:
+    """Whether the question can be answered without the conversation before it"""
+    return _REFERENCE_RE.search(question) is None
+
+
+def question_parameters(question: str) -> Tuple[str, ...]:
+    """The numbers, IDs and names in a question (eg: "B1", "warehouse 2", "VER_W1", "Verna").
+
+    Tokens with a digit, `_` or `-`, quoted strings and capitalized words past
+    the first one.
+    """
+    parameters = [(a or b).strip().lower() for a, b in _QUOTED_RE.findall(question)]
+    for i, word in enumerate(_WORD_RE.findall(_QUOTED_RE.sub(' ', question))):
+        word = word.strip('.-/')
+        if not word:
+            continue
+        if any(c.isdigit() for c in word) or '_' in word or '-' in word or (i > 0 and word[0].isupper()):
+            parameters.append(word.lower())
+    return tuple(sorted(parameters))
+
+
+def is_answered(outputs: Dict[str, Any]) -> bool:
+    """Whether the outputs hold an actual answer, not an empty one or "I don't know"."""
+    texts = [value for key, value in outputs.items() if isinstance(value, str) and key != 'sources']
+    return any(text.strip() for text in texts) and not any(_UNANSWERED_RE.search(text) for text in texts)
+
+
+class _Entry(NamedTuple):
+    question: str
+    parameters: Tuple[str, ...]
+    vector: np.ndarray
+    outputs: Dict[str, Any]
+    data_version: float
+    created_at: float
+
+
+class AnswerCache:
+    """Answers keyed by (scope, question), matched exactly or by embedding similarity"""
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 min_similarity: float = 0.93,
+                 max_entries: int = 512,
+                 data_version: Callable[[], float] = get_genesis_snapshot_timestamp):
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self.data_version = data_version
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.uncacheable = 0
+        self.parameter_mismatches = 0
+        self.unanswered = 0
+        self.near_misses: Deque[dict] = deque(maxlen=50)
+        self._miss_similarity_total = 0.0
+        self._miss_similarity_count = 0
+
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._scope_matrices: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _is_fresh(self, entry: _Entry, data_version: float, max_age: Optional[float], now: float) -> bool:
+        if entry.data_version < data_version:
+            return False
+        return max_age is None or now - entry.created_at < max_age
+
+    def _scope_matrix(self, scope: str):
+        """(keys, stacked vectors) of a scope's entries, rebuilt only after changes"""
+        matrix = self._scope_matrices.get(scope)
+        if matrix is None:
+            keys = [key for key in self._entries if key[0] == scope]
+            vectors = np.stack([self._entries[key].vector for key in keys]) if keys else None
+            matrix = (keys, vectors)
+            self._scope_matrices[scope] = matrix
+        return matrix
+
+    def _drop(self, key: Hashable):
+        del self._entries[key]
+        self._scope_matrices.pop(key[0], None)
+
+    def lookup(self, scope: str, question: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Cached outputs for the question, or None"""
+        if not is_standalone(question):
+            with self._lock:
+                self.uncacheable += 1
+            return None
+
+        normalized = normalize_question(question)
+        parameters = question_parameters(question)
+        data_version = self.data_version()
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get((scope, normalized))
+            if entry is not None:
+                if self._is_fresh(entry, data_version, max_age, now):
+                    self._entries.move_to_end((scope, normalized))
+                    self.exact_hits += 1
+                    return entry.outputs
+                self._drop((scope, normalized))
+                self.expired += 1
+
+        vector = self._embed(normalized)
+
+        with self._lock:
+            keys, vectors = self._scope_matrix(scope)
+            if vectors is None:
+                self.misses += 1
+                return None
+
+            similarities = vectors @ vector
+            for i in np.argsort(-similarities):
+                similarity = float(similarities[i])
+                entry = self._entries.get(keys[i])
+                if entry is None:
+                    continue
+                if not self._is_fresh(entry, data_version, max_age, now):
+                    self._drop(keys[i])
+                    self.expired += 1
+                    continue
+
+                if similarity >= self.min_similarity:
+                    if entry.parameters != parameters:
+                        # Same question about another unit/warehouse: a different answer
+                        self.parameter_mismatches += 1
+                        continue
+                    self._entries.move_to_end(keys[i])
+                    self.semantic_hits += 1
+                    return entry.outputs
+
+                self.misses += 1
+                self._miss_similarity_total += similarity
+                self._miss_similarity_count += 1
+                if similarity >= self.min_similarity - NEAR_MISS_MARGIN:
+                    self.near_misses.append({
+                        'question': normalized,
+                        'closest': entry.question,
+                        'similarity': similarity,
+                    })
+                return None
+
+            self.misses += 1
+            return None
+
+    def store(self, scope: str, question: str, outputs: Dict[str, Any]):
+        if not is_standalone(question):
+            return
+        if not is_answered(outputs):
+            with self._lock:
+                self.unanswered += 1
+            return
+        normalized = normalize_question(question)
+        entry = _Entry(normalized, question_parameters(question), self._embed(normalized), dict(outputs),
+                       self.data_version(), time.time())
+        with self._lock:
+            self._entries[(scope, normalized)] = entry
+            self._entries.move_to_end((scope, normalized))
+            self._scope_matrices.pop(scope, None)
+            while len(self._entries) > self.max_entries:
+                key, _ = self._entries.popitem(last=False)
+                self._scope_matrices.pop(key[0], None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scope_matrices.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                'hits': hits,
+                'exact_hits': self.exact_hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups > 0 else 0.0,
+                'expired': self.expired,
+                'uncacheable': self.uncacheable,
+                'parameter_mismatches': self.parameter_mismatches,
+                'unanswered': self.unanswered,
+                'entries': len(self._entries),
+                'min_similarity': self.min_similarity,
+                'avg_miss_similarity': (
+                    self._miss_similarity_total / self._miss_similarity_count
+                    if self._miss_similarity_count > 0 else 0.0
+                ),
+                'near_misses': list(self.near_misses),
+            }
+
+
+class CachedAnswerChain(Chain):
+    """Answers from `cache` when it can, else runs `chain` and caches its outputs.
+
+    On a hit, the wrapped chain's memory still records the turn, so follow-up
+    questions see it.
+    """
+
+    chain: Chain
+    cache: Any
+    scope: str
+    max_age: Optional[float] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def input_keys(self) -> List[str]:
+        # The wrapped chain fills in its memory variables itself
+        memory_keys = self.chain.memory.memory_variables if self.chain.memory is not None else []
+        return [key for key in self.chain.input_keys if key not in memory_keys]
+
+    @property
+    def output_keys(self) -> List[str]:
+        return self.chain.output_keys
+
+    @property
+    def _question_key(self) -> str:
+        return self.input_keys[0]
+
+    def _record_hit(self, inputs: Dict[str, Any], outputs: Dict[str, Any]):
+        if self.chain.memory is not None:
+            self.chain.memory.save_context(inputs, outputs)
+
+    def _call(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
+        question = inputs[self._question_key]
+        cached = self.cache.lookup(self.scope, question, max_age=self.max_age)
+        if cached is not None:
+            self._record_hit(inputs, cached)
+            return cached
+
+        outputs = self.chain(inputs, callbacks=_run_manager.get_child(), return_only_outputs=True)
+        self.cache.store(self.scope, question, outputs)
+        return outputs
+
+    async def _acall(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[AsyncCallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        _run_manager = run_manager or AsyncCallbackManagerForChainRun.get_noop_manager()
+        loop = asyncio.get_running_loop()
+        question = inputs[self._question_key]
+        # Embedding the question is CPU-bound
+        cached = await loop.run_in_executor(None, lambda: self.cache.lookup(self.scope, question, max_age=self.max_age))
+        if cached is not None:
+            self._record_hit(inputs, cached)
+            return cached
+
+        outputs = await self.chain.acall(inputs, callbacks=_run_manager.get_child(), return_only_outputs=True)
+        await loop.run_in_executor(None, self.cache.store, self.scope, question, outputs)
+        return outputs
+
+    @property
+    def _chain_type(self) -> str:
+        return "cached_answer_chain"
+
+
+_answer_cache: Optional[AnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """The answer cache shared by every chain in this process, using the shared embedding model"""
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                from vectorstores.hf_embedding import get_embeddings
+                _answer_cache = AnswerCache(
+                    get_embeddings(),
+                    min_similarity=get_answer_cache_min_similarity(),
+                    max_entries=get_answer_cache_max_entries()
+                )
+    return _answer_cache
@@ -0,0 +1,261 @@
+"""Process-wide TTL cache for Genesis API responses.
+
+Every Genesis tool shares one cache, so back-to-back calls for the same endpoint
+and parameters (eg: `warehouse_sensor_summary` and `warehouse_unit_list_summary`
+both read `/metrics/warehouse/{warehouse_id}`) make a single HTTP request.
+Concurrent misses for the same key are coalesced into one in-flight request,
+whether the callers are threads or coroutines. If the caller making that request
+is cancelled (eg: its client disconnected), the callers waiting on it retry and
+one of them makes the request instead.
+"""
+
+import json
+import time
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+
+import aiohttp
+
+from langchain.requests import Requests
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from .config import get_api_cache_ttl, get_api_cache_max_entries
+
+
+class CachedResponse(NamedTuple):
+    """The parts of a response the tools use, detached from the connection"""
+    status_code: int
+    reason: str
+    text: str
+    fetched_at: float
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class _OwnerCancelled(Exception):
+    """The request being waited on was cancelled along with its caller: retry it"""
+
+
+class ResponseCache:
+    """TTL cache with single-flight coalescing of concurrent misses"""
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+
+        self._entries: Dict[Hashable, CachedResponse] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _store(self, key: Hashable, response: CachedResponse):
+        self._entries.pop(key, None)
+        self._entries[key] = response
+        if len(self._entries) > self.max_entries:
+            now = time.time()
+            for stale_key in [k for k, v in self._entries.items() if now - v.fetched_at >= self.ttl]:
+                del self._entries[stale_key]
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    def _lookup(self, key: Hashable) -> Tuple[Optional[CachedResponse], Optional[Future], bool]:
+        """Fresh entry if any, else the in-flight future and whether the caller must fetch it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.time() - entry.fetched_at
+                if age < self.ttl:
+                    self.hits += 1
+                    self._served_age_total += age
+                    self._served_age_max = max(self._served_age_max, age)
+                    return entry, None, False
+
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        return None, future, is_owner
+
+    def _fail(self, key: Hashable, future: Future, e: BaseException):
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_exception(e)
+
+    def _abandon(self, key: Hashable, future: Future):
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_exception(_OwnerCancelled())
+
+    def _complete(self, key: Hashable, future: Future, response: CachedResponse):
+        with self._lock:
+            self._inflight.pop(key, None)
+            # Only successful responses are worth reusing
+            if response.status_code == 200:
+                self._store(key, response)
+        future.set_result(response)
+
+    def get(self, key: Hashable, fetch: Callable[[], CachedResponse]) -> CachedResponse:
+        """Return the fresh cached response for `key`, or fetch it exactly once"""
+        while True:
+            entry, future, is_owner = self._lookup(key)
+            if entry is not None:
+                return entry
+            if is_owner:
+                break
+            try:
+                return future.result()
+            except _OwnerCancelled:
+                continue
+
+        try:
+            response = fetch()
+        except Exception as e:
+            self._fail(key, future, e)
+            raise
+        except BaseException:
+            self._abandon(key, future)
+            raise
+        self._complete(key, future, response)
+        return response
+
+    async def aget(self, key: Hashable, fetch: Callable[[], Awaitable[CachedResponse]]) -> CachedResponse:
+        """Async `get`. Coalesces with both threads and coroutines fetching the same key"""
+        while True:
+            entry, future, is_owner = self._lookup(key)
+            if entry is not None:
+                return entry
+            if is_owner:
+                break
+            try:
+                # Shielded, so a cancelled waiter doesn't cancel the owner's request
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _OwnerCancelled:
+                continue
+
+        try:
+            response = await fetch()
+        except Exception as e:
+            self._fail(key, future, e)
+            raise
+        except BaseException:
+            # Cancelled: not an answer for the waiters, one of them takes over
+            self._abandon(key, future)
+            raise
+        self._complete(key, future, response)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests_saved = self.hits + self.coalesced
+            lookups = requests_saved + self.misses
+            now = time.time()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': requests_saved / lookups if lookups > 0 else 0.0,
+                'entries': len(self._entries),
+                'ttl_seconds': self.ttl,
+                'avg_served_age_seconds': self._served_age_total / self.hits if self.hits > 0 else 0.0,
+                'max_served_age_seconds': self._served_age_max,
+                'oldest_entry_age_seconds': max((now - v.fetched_at for v in self._entries.values()), default=0.0),
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """The cache shared by every Genesis tool in this process"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(ttl=get_api_cache_ttl(), max_entries=get_api_cache_max_entries())
+    return _response_cache
+
+
+def _cache_key(method: str, url: str, headers: Optional[Dict[str, str]], kwargs: Dict[str, Any]) -> Hashable:
+    return (
+        method,
+        url,
+        json.dumps(kwargs.get('params') or {}, sort_keys=True, default=str),
+        json.dumps(kwargs.get('data'), sort_keys=True, default=str),
+        # Different credentials may see different data
+        json.dumps(headers or {}, sort_keys=True),
+    )
+
+
+_aiohttp_sessions: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]' = weakref.WeakKeyDictionary()
+
+
+def get_aiohttp_session() -> aiohttp.ClientSession:
+    """Connection pool shared by the Genesis tools running on the current event loop"""
+    loop = asyncio.get_running_loop()
+    session = _aiohttp_sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession()
+        _aiohttp_sessions[loop] = session
+    return session
+
+
+async def close_aiohttp_session():
+    """Close the connection pool of the current event loop, eg: when the server shuts down"""
+    session = _aiohttp_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class CachedRequests(Requests):
+    """Requests whose GETs are served through a response cache (the shared one by default)"""
+
+    cache: Optional[ResponseCache] = None
+
+    def _response_cache(self) -> ResponseCache:
+        return self.cache if self.cache is not None else get_response_cache()
+
+    def _fetch(self, url: str, **kwargs: Any) -> CachedResponse:
+        response = super().get(url, **kwargs)
+        return CachedResponse(response.status_code, response.reason, response.text, time.time())
+
+    async def _afetch(self, url: str, **kwargs: Any) -> CachedResponse:
+        # aiohttp only takes str/int/float query values
+        params = {
+            k: str(v).lower() if isinstance(v, bool) else v
+            for k, v in (kwargs.get('params') or {}).items() if v is not None
+        }
+        session = self.aiosession or get_aiohttp_session()
+        async with session.get(url, headers=self.headers, auth=self.auth, **{**kwargs, 'params': params}) as response:
+            text = await response.text()
+            return CachedResponse(response.status, response.reason or '', text, time.time())
+
+    def get(self, url: str, **kwargs: Any) -> CachedResponse:
+        return self._response_cache().get(
+            _cache_key('GET', url, self.headers, kwargs),
+            lambda: self._fetch(url, **kwargs)
+        )
+
+    async def aget_response(self, url: str, **kwargs: Any) -> CachedResponse:
+        """Async GET through the response cache, over a pooled connection"""
+        return await self._response_cache().aget(
+            _cache_key('GET', url, self.headers, kwargs),
+            lambda: self._afetch(url, **kwargs)
+        )
@@ -3,16 +3,32 @@ from functools import lru_cache
 from pathlib import Path
 
 from pydantic import BaseSettings, AnyUrl, FilePath
-from typing import Union
+from typing import Optional, Union
 
 from langchain.tools.openapi.utils.openapi_utils import OpenAPISpec
 
+from .spec_registry import get_spec_registry
+from .spec_snapshot import DEFAULT_SNAPSHOT_PATH
+
 
 class GenesisSettings(BaseSettings):
     auth_token: str
     agent_is_verbose: bool = False
     tool_is_verbose: bool = False
     openapi_file: Union[AnyUrl, FilePath, str] = 'genesis_openapi.yaml'
+    openapi_revalidate_interval: float = 60.0
+    openapi_snapshot: Optional[str] = DEFAULT_SNAPSHOT_PATH
+    api_cache_ttl: float = 60.0
+    api_cache_max_entries: int = 1024
+    unit_index_ttl: float = 300.0
+    agent_pool_max_sessions: int = 256
+    agent_pool_session_ttl: float = 1800.0
+    stream_max_queued_events: int = 256
+    memory_max_tokens: int = 2000
+    answer_cache_enabled: bool = True
+    answer_cache_min_similarity: float = 0.93
+    answer_cache_max_entries: int = 512
+    answer_cache_max_age: float = 600.0
 
     class Config:
         env_file = '.env'
@@ -37,14 +53,67 @@ def get_tool_is_verbose():
 def get_openapi_file():
     return GenesisSettings().openapi_file
 
+@lru_cache()
+def get_openapi_snapshot():
+    return GenesisSettings().openapi_snapshot
+
+@lru_cache()
+def get_openapi_revalidate_interval():
+    return GenesisSettings().openapi_revalidate_interval
+
+@lru_cache()
+def get_api_cache_ttl():
+    return GenesisSettings().api_cache_ttl
+
+@lru_cache()
+def get_api_cache_max_entries():
+    return GenesisSettings().api_cache_max_entries
+
+@lru_cache()
+def get_unit_index_ttl():
+    return GenesisSettings().unit_index_ttl
+
+@lru_cache()
+def get_agent_pool_max_sessions():
+    return GenesisSettings().agent_pool_max_sessions
+
+@lru_cache()
+def get_agent_pool_session_ttl():
+    return GenesisSettings().agent_pool_session_ttl
+
+@lru_cache()
+def get_stream_max_queued_events():
+    return GenesisSettings().stream_max_queued_events
+
+@lru_cache()
+def get_memory_max_tokens():
+    return GenesisSettings().memory_max_tokens
+
+@lru_cache()
+def get_answer_cache_enabled():
+    return GenesisSettings().answer_cache_enabled
+
+@lru_cache()
+def get_answer_cache_min_similarity():
+    return GenesisSettings().answer_cache_min_similarity
+
+@lru_cache()
+def get_answer_cache_max_entries():
+    return GenesisSettings().answer_cache_max_entries
+
+@lru_cache()
+def get_answer_cache_max_age():
+    return GenesisSettings().answer_cache_max_age
+
 
 def fetch_genesis_spec() -> OpenAPISpec:
+    """The Genesis OpenAPI spec, parsed once per process and reused until the file/URL changes"""
     spec_file = get_openapi_file()
 
     if isinstance(spec_file, AnyUrl):
-        return OpenAPISpec.from_url(spec_file)
+        return get_spec_registry().from_url(spec_file, revalidate_interval=get_openapi_revalidate_interval())
     elif Path(spec_file).exists():
-        return OpenAPISpec.from_file(spec_file)
+        return get_spec_registry().from_file(spec_file, snapshot_path=get_openapi_snapshot())
 
     raise ValueError("You must set the setting `openapi_file` or `GENESIS_OPENAPI_FILE` environment to a path that exists.\nIt was set to '%s'" % str(spec_file))
 
@@ -1,20 +1,27 @@
 
 
+import asyncio
+from functools import partial
+
 from langchain.llms.base import BaseLLM
 from langchain.agents.agent_types import AgentType
 from langchain.agents.tools import BaseTool, Tool
 from langchain.agents import AgentExecutor, initialize_agent
 
 from langchain.memory import ConversationBufferWindowMemory, ConversationSummaryBufferMemory
-
+from langchain.schema import BaseMemory
 from langchain.requests import Requests
+from langchain.tools.openapi.utils.openapi_utils import OpenAPISpec
+
+from .api_cache import CachedRequests
+from .memory import TokenBudgetSummaryMemory
 
 # All tools
 from .genesis_api import *
 
-from typing import List
+from typing import List, Optional
 
-from .config import fetch_genesis_spec, get_agent_is_verbose, get_tool_is_verbose, get_auth_token
+from .config import fetch_genesis_spec, get_agent_is_verbose, get_tool_is_verbose, get_auth_token, get_memory_max_tokens
 
 # Prompts
 from .prompts import is_chat_model, get_agent_prompt, GENESIS_AGENT_PROMPT_PREFIX
@@ -28,26 +35,41 @@ from .prompts import is_chat_model, get_agent_prompt, GENESIS_AGENT_PROMPT_PREFI
 # from langchain.agents.agent_toolkits import NLAToolkit
 
 
-def get_genesis_api_agent(llm: BaseLLM, *additional_tools: BaseTool, llm_for_tool: BaseLLM = None) -> AgentExecutor:
-    """Create an Agent that executes queries for Genesis server"""
-    # Requests with auth token
-    requests = Requests(headers={"Authorization": "Bearer %s" % get_auth_token()})
+def make_agent_memory(llm: BaseLLM) -> BaseMemory:
+    """Fresh conversation memory for one agent session"""
+    # Summarizes old turns in the background, never during a user's turn
+    return TokenBudgetSummaryMemory(
+        llm=llm,
+        memory_key="chat_history",
+        return_messages=True,
+        max_token_limit=get_memory_max_tokens()
+    )
+
+
+def get_genesis_api_agent(llm: BaseLLM, *additional_tools: BaseTool, llm_for_tool: BaseLLM = None, memory: Optional[BaseMemory] = None, requests: Optional[Requests] = None,
+                          spec: Optional[OpenAPISpec] = None, verbose: Optional[bool] = None, tool_verbose: Optional[bool] = None) -> AgentExecutor:
+    """Create an Agent that executes queries for Genesis server.
+
+    The requests, spec, memory and verbosity not given are taken from the Genesis settings.
+    """
+    # Requests with auth token, served through the shared response cache
+    if requests is None:
+        requests = CachedRequests(headers={"Authorization": "Bearer %s" % get_auth_token()})
 
     # Genesis API specifications (OpenAPI)
-    spec = fetch_genesis_spec()
+    if spec is None:
+        spec = fetch_genesis_spec()
 
-    agent_verbose = get_agent_is_verbose()
-    tool_verbose = get_tool_is_verbose()
+    agent_verbose = verbose if verbose is not None else get_agent_is_verbose()
+    if tool_verbose is None:
+        tool_verbose = get_tool_is_verbose()
 
     if llm_for_tool is None:
         llm_for_tool = llm
 
     # Agent's memory
-    memory = ConversationSummaryBufferMemory(
-        llm=llm,
-        memory_key="chat_history",
-        return_messages=True
-    )
+    if memory is None:
+        memory = make_agent_memory(llm)
 
     # Create Agents for various levels
     # warehouse_level_agent = get_warehouse_level_query_agent(llm, llm_for_tool=llm_for_tool, spec=spec, requests=requests, memory=memory, verbose=tool_verbose)
@@ -96,3 +118,18 @@ def get_genesis_api_agent(llm: BaseLLM, *additional_tools: BaseTool, llm_for_too
             prefix_prompt=GENESIS_AGENT_PROMPT_PREFIX
         )
     )
+
+
+async def aget_genesis_api_agent(llm: BaseLLM, *additional_tools: BaseTool, llm_for_tool: BaseLLM = None, memory: Optional[BaseMemory] = None, requests: Optional[Requests] = None,
+                                 spec: Optional[OpenAPISpec] = None, verbose: Optional[bool] = None, tool_verbose: Optional[bool] = None) -> AgentExecutor:
+    """`get_genesis_api_agent` for use in an event loop.
+
+    Building the agent reads the OpenAPI spec (file or URL), so it is done in
+    the default executor. Every Genesis tool has a coroutine, so the returned
+    agent can be run with `acall`/`arun` without blocking the loop on HTTP calls.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        None,
+        partial(get_genesis_api_agent, llm, *additional_tools, llm_for_tool=llm_for_tool, memory=memory, requests=requests,
+                spec=spec, verbose=verbose, tool_verbose=tool_verbose)
+    )
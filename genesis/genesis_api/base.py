@@ -1,14 +1,229 @@
 
-from langchain.chains import OpenAPIEndpointChain
-from langchain.chains.base import Chain
+import re
+import json
+
+from pydantic import Field
+
 from langchain.base_language import BaseLanguageModel
+from langchain.callbacks.manager import AsyncCallbackManagerForChainRun, CallbackManagerForChainRun, Callbacks
 from langchain.requests import Requests
 from langchain.tools.base import Tool
 from langchain.tools.openapi.utils.api_models import APIOperation
 from langchain.chains.api.openapi.chain import OpenAPIEndpointChain
 from langchain.tools.openapi.utils.openapi_utils import OpenAPISpec
 
-from typing import Optional, Callable
+from typing import Any, Dict, Optional, Callable, cast
+
+from ..spec_registry import get_api_operation
+
+
+_INTEGER_RE = re.compile(r'^\s*-?\d+\s*$')
+
+
+def _coerce_parameter(schema_type: Any, value: Any):
+    """Coerce a JSON value to the parameter's type. Raises ValueError if it can't be"""
+    if schema_type == 'integer':
+        if isinstance(value, bool):
+            raise ValueError(value)
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and _INTEGER_RE.match(value):
+            return int(value)
+        raise ValueError(value)
+    if schema_type == 'number':
+        if isinstance(value, bool):
+            raise ValueError(value)
+        if isinstance(value, (int, float)):
+            return value
+        return float(value)
+    if schema_type == 'string':
+        if isinstance(value, (dict, list)):
+            raise ValueError(value)
+        return str(value)
+    if schema_type == 'boolean':
+        if not isinstance(value, bool):
+            raise ValueError(value)
+        return value
+    # Enums, arrays and unions are passed as-is for the server to validate
+    return value
+
+
+def parse_structured_input(api_operation: APIOperation, tool_input: str) -> Optional[Dict[str, Any]]:
+    """Validate a tool input against the operation's parameters.
+
+    Returns the request arguments if the input is a JSON object with every
+    required parameter present and of the right type (unknown keys such as
+    "original_query" are dropped), else None.
+    """
+    if len(tool_input.strip()) == 0:
+        args = {}
+    else:
+        try:
+            args = json.loads(tool_input)
+        except ValueError:
+            return None
+    if not isinstance(args, dict):
+        return None
+
+    request_args = {}
+    for prop in api_operation.properties:
+        if prop.name not in args or args[prop.name] is None:
+            if prop.required:
+                return None
+            continue
+        try:
+            request_args[prop.name] = _coerce_parameter(prop.type, args[prop.name])
+        except (TypeError, ValueError):
+            return None
+
+    for param in api_operation.body_params:
+        if param in args:
+            request_args[param] = args[param]
+
+    return request_args
+
+
+class StructuredOpenAPIEndpointChain(OpenAPIEndpointChain):
+    """OpenAPIEndpointChain that only asks the LLM for arguments when it has to.
+
+    If the input already validates against the operation's parameters (eg:
+    `{"warehouse_id": 1}`), the request is made directly. Otherwise the LLM
+    synthesizes the arguments as usual, and those are memoized per input.
+    """
+
+    synthesized_arguments: Dict[str, str] = Field(default_factory=dict, exclude=True)
+    max_synthesized_arguments: int = 256
+
+    def _remember_arguments(self, instructions: str, api_arguments: str):
+        # Don't remember failures, the next attempt may be phrased better
+        if not api_arguments.startswith(('ERROR', 'MESSAGE:')):
+            if len(self.synthesized_arguments) >= self.max_synthesized_arguments:
+                self.synthesized_arguments.pop(next(iter(self.synthesized_arguments)))
+            self.synthesized_arguments[instructions] = api_arguments
+
+    def _get_api_arguments(self, instructions: str, run_manager: CallbackManagerForChainRun) -> str:
+        structured_args = parse_structured_input(self.api_operation, instructions)
+        if structured_args is not None:
+            return json.dumps(structured_args)
+
+        api_arguments = self.synthesized_arguments.get(instructions)
+        if api_arguments is not None:
+            return api_arguments
+
+        api_arguments = cast(str, self.api_request_chain.predict_and_parse(
+            instructions=instructions, callbacks=run_manager.get_child()
+        ))
+        self._remember_arguments(instructions, api_arguments)
+        return api_arguments
+
+    async def _aget_api_arguments(self, instructions: str, run_manager: AsyncCallbackManagerForChainRun) -> str:
+        structured_args = parse_structured_input(self.api_operation, instructions)
+        if structured_args is not None:
+            return json.dumps(structured_args)
+
+        api_arguments = self.synthesized_arguments.get(instructions)
+        if api_arguments is not None:
+            return api_arguments
+
+        api_arguments = cast(str, await self.api_request_chain.apredict_and_parse(
+            instructions=instructions, callbacks=run_manager.get_child()
+        ))
+        self._remember_arguments(instructions, api_arguments)
+        return api_arguments
+
+    def _response_text(self, request_args: Dict[str, Any], status_code: int, reason: str, text: str) -> str:
+        if status_code != 200:
+            method_str = str(self.api_operation.method.value)
+            return (
+                f"{status_code}: {reason}"
+                + f"\nFor {method_str.upper()}  {request_args['url']}\n"
+                + f"Called with args: {request_args['params']}"
+            )
+        return text
+
+    def _call(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Dict[str, str]:
+        _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
+        intermediate_steps = {}
+        instructions = inputs[self.instructions_key]
+        instructions = instructions[: self.max_text_length]
+        api_arguments = self._get_api_arguments(instructions, _run_manager)
+        intermediate_steps["request_args"] = api_arguments
+        _run_manager.on_text(api_arguments, color="green", end="\n", verbose=self.verbose)
+        if api_arguments.startswith("ERROR"):
+            return self._get_output(api_arguments, intermediate_steps)
+        elif api_arguments.startswith("MESSAGE:"):
+            return self._get_output(api_arguments[len("MESSAGE:"):], intermediate_steps)
+        try:
+            request_args = self.deserialize_json_input(api_arguments)
+            method = getattr(self.requests, self.api_operation.method.value)
+            api_response = method(**request_args)
+            response_text = self._response_text(request_args, api_response.status_code, api_response.reason, api_response.text)
+        except Exception as e:
+            response_text = f"Error with message {str(e)}"
+        response_text = response_text[: self.max_text_length]
+        intermediate_steps["response_text"] = response_text
+        _run_manager.on_text(response_text, color="blue", end="\n", verbose=self.verbose)
+        if self.api_response_chain is not None:
+            answer = cast(str, self.api_response_chain.predict_and_parse(
+                response=response_text,
+                instructions=instructions,
+                callbacks=_run_manager.get_child(),
+            ))
+            _run_manager.on_text(answer, color="yellow", end="\n", verbose=self.verbose)
+            return self._get_output(answer, intermediate_steps)
+        return self._get_output(response_text, intermediate_steps)
+
+    async def _arequest(self, request_args: Dict[str, Any]) -> str:
+        method = self.api_operation.method.value
+        if method == 'get' and hasattr(self.requests, 'aget_response'):
+            api_response = await self.requests.aget_response(**request_args)
+            return self._response_text(request_args, api_response.status_code, api_response.reason, api_response.text)
+
+        async with getattr(self.requests, 'a' + method)(**request_args) as api_response:
+            return self._response_text(request_args, api_response.status, api_response.reason, await api_response.text())
+
+    async def _acall(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[AsyncCallbackManagerForChainRun] = None,
+    ) -> Dict[str, str]:
+        _run_manager = run_manager or AsyncCallbackManagerForChainRun.get_noop_manager()
+        intermediate_steps = {}
+        instructions = inputs[self.instructions_key]
+        instructions = instructions[: self.max_text_length]
+        api_arguments = await self._aget_api_arguments(instructions, _run_manager)
+        intermediate_steps["request_args"] = api_arguments
+        await _run_manager.on_text(api_arguments, color="green", end="\n", verbose=self.verbose)
+        if api_arguments.startswith("ERROR"):
+            return self._get_output(api_arguments, intermediate_steps)
+        elif api_arguments.startswith("MESSAGE:"):
+            return self._get_output(api_arguments[len("MESSAGE:"):], intermediate_steps)
+        try:
+            request_args = self.deserialize_json_input(api_arguments)
+            response_text = await self._arequest(request_args)
+        except Exception as e:
+            response_text = f"Error with message {str(e)}"
+        response_text = response_text[: self.max_text_length]
+        intermediate_steps["response_text"] = response_text
+        await _run_manager.on_text(response_text, color="blue", end="\n", verbose=self.verbose)
+        if self.api_response_chain is not None:
+            answer = cast(str, await self.api_response_chain.apredict_and_parse(
+                response=response_text,
+                instructions=instructions,
+                callbacks=_run_manager.get_child(),
+            ))
+            await _run_manager.on_text(answer, color="yellow", end="\n", verbose=self.verbose)
+            return self._get_output(answer, intermediate_steps)
+        return self._get_output(response_text, intermediate_steps)
+
+
+CHAIN_ERROR_MESSAGE = 'Error making request. Try again in some time.'
 
 
 def create_api_tool(llm: BaseLanguageModel,
@@ -20,9 +235,15 @@ def create_api_tool(llm: BaseLanguageModel,
                      description: Optional[str] = None,
                      verbose: bool = False,
                      auto_parse_output_using_llm: bool = False,
-                     output_processor: Optional[Callable[[Chain], Callable[..., str]]] = None):
-    api_operation = APIOperation.from_openapi_spec(spec, endpoint, method)
-    chain = OpenAPIEndpointChain.from_api_operation(
+                     output_processor: Optional[Callable[[str, str], str]] = None):
+    """Tool calling one Genesis endpoint, usable from both `run` and `arun`.
+
+    `output_processor(query, response_text)` turns the raw endpoint response
+    into the tool's output. If the chain itself fails, the tool returns
+    `CHAIN_ERROR_MESSAGE` instead.
+    """
+    api_operation = get_api_operation(spec, endpoint, method)
+    chain = StructuredOpenAPIEndpointChain.from_api_operation(
         api_operation,
         llm,
         requests=requests,
@@ -32,8 +253,23 @@ def create_api_tool(llm: BaseLanguageModel,
     )
 
     if output_processor is not None:
+        def run(query: str, callbacks: Callbacks = None) -> str:
+            try:
+                response_text = chain.run(query, callbacks=callbacks)
+            except Exception:
+                return CHAIN_ERROR_MESSAGE
+            return output_processor(query, response_text)
+
+        async def arun(query: str, callbacks: Callbacks = None) -> str:
+            try:
+                response_text = await chain.arun(query, callbacks=callbacks)
+            except Exception:
+                return CHAIN_ERROR_MESSAGE
+            return output_processor(query, response_text)
+
         return Tool.from_function(
-            func=output_processor(chain),
+            func=run,
+            coroutine=arun,
             name=name or api_operation.operation_id,
             description=description or api_operation.description,
             verbose=verbose
@@ -43,5 +279,6 @@ def create_api_tool(llm: BaseLanguageModel,
         name=name or api_operation.operation_id,
         description=description or api_operation.description,
         func=chain.run,
+        coroutine=chain.arun,
         verbose=verbose
     )
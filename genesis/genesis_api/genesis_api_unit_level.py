@@ -1,69 +1,28 @@
 
-import json
-import pandas as pd
-
 from .base import create_api_tool
+from .render import render_sensor_table, table_output_processor
 
 from langchain.agents import AgentExecutor, initialize_agent
-from langchain.tools.base import Tool
 from langchain.agents.agent_types import AgentType
-from langchain.chains import OpenAPIEndpointChain
-from langchain.chains.api.openapi.chain import OpenAPIEndpointChain
 
 from .genesis_api_utility import get_tool_genesis_unit_search
 from ..prompts import is_chat_model, get_agent_prompt, GENESIS_UNIT_LEVEL_AGENT_PROMPT_PREFIX
 
-from typing import Callable
-
 
 def get_tool_genesis_unit_sensor_list(llm, spec, requests, verbose: bool = False):
-    def process_chain_output(chain: OpenAPIEndpointChain) -> Callable[..., str]:
-        def unit_sensor_summary(query: str) -> str:
-            try:
-                response_data = chain.run(query)
-                resp_json = json.loads(response_data)
-            except:
-                return 'Error making request. Try again in some time.'
-
-            response_text_summary = ''
-            
-            response_text_summary += '# Unit-level sensors\n'
-            unitlvl_sensors = resp_json['uv_unit_metrics']
-
-            unitlvl_df = pd.DataFrame(unitlvl_sensors)
-            if len(unitlvl_df) == 0:
-                return 'No metrics are present in this unit'
-
-            response_text_summary += "Level info: ## is Sensor type, ### is Sensor subtype\n"
-            response_text_summary += "Sensor data format: Sensor ID // Name // Value // Status\n"
-
-            for metric_type_name, df_mt in unitlvl_df.groupby('Metric Type'):
-                response_text_summary += "## %s\n" % metric_type_name
-                for metric_subtype_name, df_mst in df_mt.groupby('Metric Sub-Type'):
-                    response_text_summary += "### %s\n" % metric_subtype_name
-                    for lbl, sensor_row in df_mst.iterrows():
-                        name = sensor_row['Sensor Name']
-                        val = sensor_row['Value'] or ''
-                        if sensor_row['Unit'] is not None:
-                            val += ' ' + sensor_row['Unit']
-                        if sensor_row['Value Duration Minutes'] is not None:
-                            val += '(for %s)' % sensor_row['Value Duration Minutes']
-                        response_text_summary += '{} // {} // {} // {}\n'.format(
-                            sensor_row['Sensor Id'],
-                            name,
-                            val,
-                            sensor_row['State']
-                        )
-
-            return response_text_summary
-        return unit_sensor_summary
+    process_response = table_output_processor(
+        render_sensor_table,
+        title='Unit-level sensors',
+        response_key='uv_unit_metrics',
+        empty_message='No metrics are present in this unit'
+    )
     return create_api_tool(
         llm, spec, requests,
         '/metrics/warehouse/{warehouse_id}/unit/{unit_id}',
         name='unit_sensor_summary',
-        description='''Use to get a summary and list of all sensors at unit-level/location given the `warehouse_id` and `unit_id` value, not the name. Provide input as valid stringified JSON with the parameters. eg: "{{\\"warehouse_id\\": 1}}"''',
+        description='''Use to get a summary and list of all sensors at unit-level/location given the `warehouse_id` and `unit_id` value, not the name. Provide input as valid stringified JSON with the parameters. eg: "{{\\"warehouse_id\\": 1, \\"unit_id\\": 1001}}". Optionally add "columns": a list of only the fields needed, out of "Sensor Id", "Sensor Name", "Value", "State", "Threshold crosses", "Percentage".''',
         verbose=verbose,
-        output_processor=process_chain_output
+        output_processor=process_response
     )
 
 
@@ -1,27 +1,85 @@
 
+import json
+import asyncio
+import threading
+
 from langchain.tools.base import Tool
-from langchain.tools.openapi.utils.api_models import APIOperation
-from langchain.chains.api.openapi.chain import OpenAPIEndpointChain
+
+from typing import Dict, List, Optional, Tuple
+
+from .unit_index import UnitNameIndex
+from ..config import get_unit_index_ttl
+
+
+_unit_indexes: Dict[Tuple[str, str], UnitNameIndex] = {}
+_unit_indexes_lock = threading.Lock()
+
+
+def _load_all_units(base_url: str, requests) -> List[dict]:
+    units = []
+    base_url = base_url.rstrip('/')
+    for loc in requests.get(base_url + '/locations').json():
+        warlvl_details = requests.get(base_url + '/metrics/warehouse/%s' % loc['id']).json()
+        for unit in warlvl_details.get('wv_unit_summary', []):
+            units.append({**unit, 'warehouse_id': loc['id']})
+    return units
+
+
+def get_unit_name_index(base_url: str, requests) -> UnitNameIndex:
+    """Unit index shared by every tool of the same server and credentials"""
+    key = (base_url, json.dumps(requests.headers or {}, sort_keys=True))
+    with _unit_indexes_lock:
+        index = _unit_indexes.get(key)
+        if index is None:
+            index = UnitNameIndex(lambda: _load_all_units(base_url, requests), ttl=get_unit_index_ttl())
+            _unit_indexes[key] = index
+    return index
+
+
+def _parse_unit_query(query: str) -> Tuple[str, Optional[int]]:
+    """Accept a bare name, a quoted name or JSON like {"unit_name": ..., "warehouse_id": ...}"""
+    query = query.strip()
+    try:
+        args = json.loads(query)
+    except ValueError:
+        return query.strip('"\''), None
+
+    if isinstance(args, str):
+        return args, None
+    if not isinstance(args, dict):
+        return query, None
+
+    name = next((args[k] for k in ('unit_name', 'name', 'unit', 'query') if isinstance(args.get(k), str)), '')
+    warehouse_id = args.get('warehouse_id')
+    try:
+        warehouse_id = int(warehouse_id) if warehouse_id is not None else None
+    except (TypeError, ValueError):
+        warehouse_id = None
+    return name, warehouse_id
 
 
 def get_tool_genesis_unit_search(llm, spec, requests, verbose: bool = False):
-    api_operation = APIOperation.from_openapi_spec(spec, '/metrics/warehouse/{warehouse_id}', 'get')
-    unit_search_chain = OpenAPIEndpointChain.from_api_operation(
-        api_operation,
-        llm,
-        requests=requests,
-        verbose=verbose,
-        return_intermediate_steps=False,
-        raw_response=True
-    )
     def unit_search(query: str) -> str:
-        print("Query:", query)
-        response = unit_search_chain.run("Find the unit with name or alias as \"%s\"" % query.replace('"', "'"))
-        print("Response:", response)
-        return 'Not found'
+        name, warehouse_id = _parse_unit_query(query)
+        if len(name) == 0:
+            return 'Not found'
+        try:
+            # Looked up on use, so building the tool reads no settings
+            matches = get_unit_name_index(spec.base_url, requests).search(name, warehouse_id=warehouse_id)
+        except Exception:
+            return 'Error making request. Try again in some time.'
+        if len(matches) == 0:
+            return 'Not found'
+        unit = matches[0].unit
+        return json.dumps({"unit_id": unit.unit_id, "warehouse_id": unit.warehouse_id})
+
+    async def aunit_search(query: str) -> str:
+        # The first search (or an expired index) loads every unit, keep that off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, unit_search, query)
 
     return Tool.from_function(
         func=unit_search,
+        coroutine=aunit_search,
         name='unit_search',
         description='''Use to find the id of a unit from the unit's name. For example, unit named "Cipla" can return id 1000, "B2 Basement" can be 1001, etc. This ID is used for other tools. Provide input only of the Unit name to search for, for example, "Cipla", "B2 Basement", and will return the id of the unit and warehouse, else "Not found".
 Response will be a JSON in the following format:
@@ -0,0 +1,143 @@
+"""Text renderers for the sensor and unit lists returned by the Genesis tools.
+
+Rows are formatted column-wise into a list of lines and joined once. Callers
+can project only the columns a question needs.
+"""
+
+import json
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+SENSOR_COLUMNS: Dict[str, str] = {
+    'Sensor Id': 'Sensor ID',
+    'Sensor Name': 'Name',
+    'Value': 'Value',
+    'State': 'Status',
+    'Threshold crosses': 'Threshold crosses',
+    'Percentage': 'Percentage',
+}
+DEFAULT_SENSOR_COLUMNS = ['Sensor Id', 'Sensor Name', 'Value', 'State']
+
+UNIT_COLUMNS: Dict[str, str] = {
+    'Unit Id': 'Unit ID',
+    'Unit Name': 'Name (alias)',
+    'Value': 'Number of out_of_range sensors',
+    'State': 'Status',
+}
+DEFAULT_UNIT_COLUMNS = ['Unit Id', 'Unit Name', 'Value', 'State']
+
+
+def _project(requested: Optional[Sequence[str]], available: Dict[str, str], default: List[str]) -> List[str]:
+    if not requested:
+        return default
+    columns = [c for c in requested if c in available]
+    return columns or default
+
+
+def _text(value) -> str:
+    return '' if value is None else str(value)
+
+
+def _sensor_value_column(rows: List[dict]) -> List[str]:
+    """Value with its measure unit and duration, eg: "23.5 Celsius(for 30)" """
+    values = []
+    for row in rows:
+        val = _text(row.get('Value'))
+        if row.get('Unit') is not None:
+            val += ' ' + str(row['Unit'])
+        if row.get('Value Duration Minutes') is not None:
+            val += '(for %s)' % row['Value Duration Minutes']
+        values.append(val)
+    return values
+
+
+def _unit_name_column(rows: List[dict]) -> List[str]:
+    return [
+        _text(row.get('Unit Name')) + ('(%s)' % row['Unit Alias'] if row.get('Unit Alias') is not None else '')
+        for row in rows
+    ]
+
+
+def render_sensor_table(title: str, rows: List[dict], columns: Optional[Sequence[str]] = None) -> str:
+    """Sensors grouped by type (##) and subtype (###), one line per sensor"""
+    columns = _project(columns, SENSOR_COLUMNS, DEFAULT_SENSOR_COLUMNS)
+    rows = sorted(rows, key=lambda row: (_text(row.get('Metric Type')), _text(row.get('Metric Sub-Type'))))
+
+    column_values = [
+        _sensor_value_column(rows) if column == 'Value' else [_text(row.get(column)) for row in rows]
+        for column in columns
+    ]
+    row_lines = [' // '.join(cells) + '\n' for cells in zip(*column_values)]
+
+    lines = [
+        '# %s\n' % title,
+        'Level info: ## is Sensor type, ### is Sensor subtype\n',
+        'Sensor data format: %s\n' % ' // '.join(SENSOR_COLUMNS[c] for c in columns),
+    ]
+    current_type = current_subtype = None
+    for row, line in zip(rows, row_lines):
+        metric_type, metric_subtype = _text(row.get('Metric Type')), _text(row.get('Metric Sub-Type'))
+        if metric_type != current_type:
+            lines.append('## %s\n' % metric_type)
+            current_type, current_subtype = metric_type, None
+        if metric_subtype != current_subtype:
+            lines.append('### %s\n' % metric_subtype)
+            current_subtype = metric_subtype
+        lines.append(line)
+
+    return ''.join(lines)
+
+
+def render_unit_table(title: str, rows: List[dict], columns: Optional[Sequence[str]] = None) -> str:
+    """Units in the order given, one line per unit"""
+    columns = _project(columns, UNIT_COLUMNS, DEFAULT_UNIT_COLUMNS)
+
+    column_values = []
+    for column in columns:
+        if column == 'Unit Name':
+            cells = _unit_name_column(rows)
+        else:
+            cells = [_text(row.get(column)) for row in rows]
+        # Everything but the ID is quoted
+        column_values.append(cells if column == 'Unit Id' else ['`%s`' % c for c in cells])
+
+    lines = [
+        '# %s\n' % title,
+        '> Data format: %s\n' % ', '.join(
+            UNIT_COLUMNS[c] if c == 'Unit Id' else '`%s`' % UNIT_COLUMNS[c] for c in columns
+        ),
+    ]
+    lines.extend(', '.join(cells) + '\n' for cells in zip(*column_values))
+    return ''.join(lines)
+
+
+def requested_columns(query: str) -> Optional[List[str]]:
+    """The optional "columns" list from a JSON tool input"""
+    try:
+        args = json.loads(query)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(args, dict) and isinstance(args.get('columns'), list):
+        return [str(c) for c in args['columns']]
+    return None
+
+
+def table_output_processor(render: Callable[..., str],
+                           title: str,
+                           response_key: str,
+                           empty_message: str) -> Callable[[str, str], str]:
+    """Output processor for `create_api_tool` that renders `response_key` of the response as a table"""
+    def process_response(query: str, response_data: str) -> str:
+        try:
+            resp_json = json.loads(response_data)
+        except (TypeError, ValueError):
+            return 'Error making request. Try again in some time.'
+        if not isinstance(resp_json, dict):
+            return 'Error making request. Try again in some time.'
+
+        rows = resp_json.get(response_key) or []
+        if len(rows) == 0:
+            return empty_message
+        return render(title, rows, columns=requested_columns(query))
+    return process_response
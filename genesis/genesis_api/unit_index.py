@@ -0,0 +1,147 @@
+"""In-memory fuzzy index over unit names and aliases of every warehouse"""
+
+import re
+import time
+import heapq
+import threading
+from itertools import chain
+from collections import Counter, defaultdict
+
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+
+_NON_ALNUM_RE = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_name(name: str) -> str:
+    return _NON_ALNUM_RE.sub(' ', name.lower()).strip()
+
+
+def trigrams(name: str) -> Set[str]:
+    padded = '  %s ' % normalize_name(name)
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class UnitRecord(NamedTuple):
+    unit_id: int
+    warehouse_id: int
+    name: str
+
+
+class UnitMatch(NamedTuple):
+    score: float
+    unit: UnitRecord
+
+
+class _Snapshot(NamedTuple):
+    """One build of the index, replaced as a whole"""
+    records: List[UnitRecord]
+    gram_counts: List[int]
+    exact: Dict[str, List[int]]
+    postings: Dict[str, List[int]]
+
+
+_EMPTY_SNAPSHOT = _Snapshot([], [], {}, {})
+
+
+class UnitNameIndex:
+    """Trigram index of units, rebuilt from `loader` once it is older than `ttl` seconds.
+
+    `loader` returns rows with the keys of `wv_unit_summary` ("Unit Id",
+    "Unit Name", "Unit Alias") plus the "warehouse_id" they belong to. Names and
+    aliases are both indexed. A stale index keeps answering while a fresh one
+    is built in the background.
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[dict]], ttl: float = 300.0):
+        self.loader = loader
+        self.ttl = ttl
+
+        self._snapshot = _EMPTY_SNAPSHOT
+        self._built_at: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _build(self):
+        records, gram_counts = [], []
+        exact = defaultdict(list)
+        postings = defaultdict(list)
+
+        for row in self.loader():
+            for name in (row.get('Unit Name'), row.get('Unit Alias')):
+                if not name:
+                    continue
+                idx = len(records)
+                records.append(UnitRecord(int(row['Unit Id']), int(row['warehouse_id']), name))
+                name_grams = trigrams(name)
+                gram_counts.append(len(name_grams))
+                exact[normalize_name(name)].append(idx)
+                for gram in name_grams:
+                    postings[gram].append(idx)
+
+        # A single assignment, so readers never see a half-built index or parts of two builds
+        self._snapshot = _Snapshot(records, gram_counts, dict(exact), dict(postings))
+        self._built_at = time.monotonic()
+
+    def _background_refresh(self):
+        try:
+            self._build()
+        finally:
+            self._refreshing = False
+
+    def refresh(self, force: bool = False):
+        """Build the index if missing, or start a background rebuild if stale"""
+        if self._built_at is None:
+            with self._lock:
+                if self._built_at is None:
+                    self._build()
+            return
+        if force:
+            with self._lock:
+                self._build()
+            return
+        if time.monotonic() - self._built_at >= self.ttl and not self._refreshing:
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def search(self, query: str, warehouse_id: Optional[int] = None, limit: int = 1, min_score: float = 0.3) -> List[UnitMatch]:
+        """Best matching units for the query, by trigram similarity (1.0 is an exact match)"""
+        self.refresh()
+        # Read once: a background refresh may swap in another build meanwhile
+        snapshot = self._snapshot
+        records = snapshot.records
+
+        def in_warehouse(scored):
+            if warehouse_id is None:
+                return scored
+            return [(score, idx) for score, idx in scored if records[idx].warehouse_id == warehouse_id]
+
+        # Exact name matches, unless they are all in other warehouses
+        scored = in_warehouse([(1.0, idx) for idx in snapshot.exact.get(normalize_name(query), ())])
+        if not scored:
+            query_grams = trigrams(query)
+            num_query_grams = len(query_grams)
+            common = Counter(chain.from_iterable(snapshot.postings.get(gram, ()) for gram in query_grams))
+            scored = in_warehouse([
+                (shared / (num_query_grams + snapshot.gram_counts[idx] - shared), idx)
+                for idx, shared in common.items()
+            ])
+
+        # A unit is indexed under its name and its alias, so over-fetch before de-duplicating
+        scored = heapq.nlargest(
+            limit * 2,
+            (item for item in scored if item[0] >= min_score),
+            key=lambda item: (item[0], -item[1])
+        )
+
+        best: Dict[int, UnitMatch] = {}
+        for score, idx in scored:
+            unit = records[idx]
+            if unit.unit_id not in best:
+                best[unit.unit_id] = UnitMatch(score, unit)
+
+        return sorted(best.values(), key=lambda m: -m.score)[:limit]
@@ -1,15 +1,22 @@
 """The Genesis Langchain generated for use with langcorn"""
 
 from .chat_chain import agent_chain
+from .genesis_agent import make_agent_memory
+from .agent_pool import get_genesis_agent_pool
+from .metrics import get_metrics_callback_handler
 
 from langchain.chat_models import ChatOpenAI
 from langchain.llms import OpenAI
 
 
+metrics = get_metrics_callback_handler()
+
 chat_llm = ChatOpenAI(
     model_name="gpt-3.5-turbo",
     temperature=0.1,
     max_tokens=512,
+    # Tokens reach callbacks as they arrive, for the SSE endpoint
+    streaming=True,
     # verbose=True
 )
 
@@ -19,4 +26,20 @@ completion_llm = OpenAI(
     # verbose=True
 )
 
-chain = agent_chain(chat_llm, llm_for_tool=completion_llm)
+# langcorn runs `chain` without callbacks, so attach them to it, its LLMs and its tools.
+# They are copies: the pool below passes the same handler down each run, and
+# shared objects carrying it too would record every call twice.
+chain = agent_chain(
+    chat_llm.copy(update={'callbacks': [metrics]}),
+    llm_for_tool=completion_llm.copy(update={'callbacks': [metrics]})
+)
+chain.callbacks = [metrics]
+for tool in chain.tools:
+    tool.callbacks = [metrics]
+
+# Per-session agents sharing the tools (and spec, LLM clients) of their template
+agent_pool = get_genesis_agent_pool(
+    agent_chain(chat_llm, llm_for_tool=completion_llm),
+    memory_factory=lambda: make_agent_memory(chat_llm),
+    callbacks=[metrics]
+)
@@ -0,0 +1,177 @@
+"""Conversation memory with a hard token budget and background summarization.
+
+`ConversationSummaryBufferMemory` summarizes overflowing turns inside
+`save_context`, so the user whose turn overflows the buffer waits for an extra
+LLM call. `TokenBudgetSummaryMemory` drops the oldest turns from the prompt as
+soon as the budget is exceeded (the prompt never goes over it), and folds them
+into the running summary on a worker thread after the turn has finished.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+
+import tiktoken
+
+from pydantic import PrivateAttr
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.summary import SummarizerMixin
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage, get_buffer_string
+
+from typing import Any, Dict, List, Optional
+
+
+# OpenAI chat format overheads (see openai-cookbook "How to count tokens with tiktoken")
+_TOKENS_PER_MESSAGE = 3
+_TOKENS_PER_REPLY = 3
+
+_summarizer_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='memory-summarizer')
+
+
+@lru_cache()
+def _get_encoding(model_name: Optional[str]) -> tiktoken.Encoding:
+    if model_name is not None:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding('cl100k_base')
+
+
+def _role(message: BaseMessage) -> str:
+    if isinstance(message, HumanMessage):
+        return 'user'
+    if isinstance(message, AIMessage):
+        return 'assistant'
+    if isinstance(message, SystemMessage):
+        return 'system'
+    return getattr(message, 'role', message.type)
+
+
+class TokenBudgetSummaryMemory(BaseChatMemory, SummarizerMixin):
+    """Recent turns verbatim plus a summary of older ones, within `max_token_limit` tokens"""
+
+    max_token_limit: int = 2000
+    moving_summary_buffer: str = ""
+    memory_key: str = "history"
+
+    summaries_made: int = 0
+    summary_failures: int = 0
+
+    _message_tokens: List[int] = PrivateAttr(default_factory=list)
+    # The messages counted, kept alive so their id() can't be reused by new messages
+    _counted_messages: List[BaseMessage] = PrivateAttr(default_factory=list)
+    _pending: List[BaseMessage] = PrivateAttr(default_factory=list)
+    _summarizing: Optional[Future] = PrivateAttr(default=None)
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+
+    @property
+    def buffer(self) -> List[BaseMessage]:
+        return self.chat_memory.messages
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _encoding(self) -> tiktoken.Encoding:
+        return _get_encoding(getattr(self.llm, 'model_name', None))
+
+    def count_message_tokens(self, message: BaseMessage) -> int:
+        encoding = self._encoding()
+        return _TOKENS_PER_MESSAGE + len(encoding.encode(_role(message))) + len(encoding.encode(message.content))
+
+    def _buffer_tokens(self) -> List[int]:
+        # Messages can be replaced from outside (eg: langcorn restores them per request)
+        buffer = self.buffer
+        counted = self._counted_messages
+        if len(buffer) != len(counted) or any(m is not c for m, c in zip(buffer, counted)):
+            # Safe to key on id(): the counted messages are still referenced
+            known = {id(m): tokens for m, tokens in zip(counted, self._message_tokens)}
+            self._message_tokens = [
+                known[id(m)] if id(m) in known else self.count_message_tokens(m)
+                for m in buffer
+            ]
+            self._counted_messages = list(buffer)
+        return self._message_tokens
+
+    def _summary_tokens(self) -> int:
+        if self.moving_summary_buffer == "":
+            return 0
+        return self.count_message_tokens(self.summary_message_cls(content=self.moving_summary_buffer))
+
+    @property
+    def num_tokens(self) -> int:
+        """Tokens the memory adds to the prompt"""
+        with self._lock:
+            return _TOKENS_PER_REPLY + self._summary_tokens() + sum(self._buffer_tokens())
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            buffer = list(self.buffer)
+            if self.moving_summary_buffer != "":
+                buffer.insert(0, self.summary_message_cls(content=self.moving_summary_buffer))
+        if self.return_messages:
+            return {self.memory_key: buffer}
+        return {self.memory_key: get_buffer_string(buffer, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        with self._lock:
+            super().save_context(inputs, outputs)
+            self.prune()
+
+    def prune(self) -> None:
+        """Move the oldest messages out of the prompt until it fits, and summarize them later"""
+        with self._lock:
+            tokens = self._buffer_tokens()
+            budget = self.max_token_limit - _TOKENS_PER_REPLY - self._summary_tokens()
+            total = sum(tokens)
+            pruned = 0
+            # Always keep the latest message, even if it alone is over budget
+            while total > budget and pruned < len(tokens) - 1:
+                total -= tokens[pruned]
+                pruned += 1
+            if pruned == 0:
+                return
+
+            self._pending.extend(self.buffer[:pruned])
+            del self.buffer[:pruned]
+            del self._message_tokens[:pruned]
+            del self._counted_messages[:pruned]
+            if self._summarizing is None:
+                self._summarizing = _summarizer_pool.submit(self._summarize_pending)
+
+    def _summarize_pending(self):
+        while True:
+            with self._lock:
+                messages, self._pending = self._pending, []
+                summary = self.moving_summary_buffer
+                if len(messages) == 0:
+                    self._summarizing = None
+                    return
+            try:
+                new_summary = self.predict_new_summary(messages, summary)
+            except Exception:
+                # Those turns are lost from the summary, the conversation goes on
+                with self._lock:
+                    self.summary_failures += 1
+                continue
+            with self._lock:
+                self.moving_summary_buffer = new_summary
+                self.summaries_made += 1
+                # A longer summary leaves less room for verbatim turns
+                self.prune()
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait for background summarization to finish"""
+        future = self._summarizing
+        if future is not None:
+            future.result(timeout)
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self.moving_summary_buffer = ""
+            self._message_tokens = []
+            self._counted_messages = []
+            self._pending = []
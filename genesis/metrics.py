@@ -0,0 +1,215 @@
+"""Prometheus metrics of agent runs: chains, agent steps, tools and LLM calls.
+
+`MetricsCallbackHandler` records a latency histogram (whose `_count` is the
+number of calls) per chain, tool and LLM call, labelled with the outcome, plus
+prompt/completion tokens and errors by exception type. An agent step is the time
+the agent takes to decide on its next action, from the start of the run or
+the end of the previous tool.
+
+Under gunicorn each worker has its own metrics. Set `PROMETHEUS_MULTIPROC_DIR`
+to an empty directory before the workers start (`prestart.sh` does this in the
+Docker image) and `render_metrics` adds up the metrics of all workers.
+"""
+
+import os
+import time
+import threading
+from uuid import UUID
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.schema import AgentAction, AgentFinish, BaseMessage, LLMResult
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .memory import _get_encoding
+
+
+# LLM calls and agent runs take seconds to minutes
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+CHAIN_SECONDS = Histogram(
+    'genesis_chain_seconds', 'Chain run latency', ['chain', 'status'], buckets=LATENCY_BUCKETS
+)
+AGENT_STEP_SECONDS = Histogram(
+    'genesis_agent_step_seconds', 'Time for the agent to decide its next action', ['action'], buckets=LATENCY_BUCKETS
+)
+TOOL_SECONDS = Histogram(
+    'genesis_tool_seconds', 'Tool call latency', ['tool', 'status'], buckets=LATENCY_BUCKETS
+)
+LLM_SECONDS = Histogram(
+    'genesis_llm_seconds', 'LLM call latency', ['model', 'status'], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    'genesis_llm_tokens', 'LLM tokens, as reported by the API or counted with tiktoken when streaming', ['model', 'kind']
+)
+ERRORS = Counter(
+    'genesis_errors', 'Errors raised by chains, tools and LLM calls', ['component', 'name', 'error']
+)
+
+
+class _Run(NamedTuple):
+    name: str
+    started: float
+    prompt: Optional[str] = None
+
+
+def _class_name(serialized: Dict[str, Any]) -> str:
+    return (serialized.get('id') or ['unknown'])[-1]
+
+
+def _model_name(serialized: Dict[str, Any], invocation_params: Optional[dict]) -> str:
+    params = invocation_params or {}
+    return params.get('model_name') or params.get('model') or _class_name(serialized)
+
+
+def _count_tokens(model: str, text: str) -> Optional[int]:
+    try:
+        return len(_get_encoding(model).encode(text))
+    except Exception:
+        # No tiktoken encoding available (eg: offline), leave it uncounted
+        return None
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Records Prometheus metrics of every run it is passed to. One instance can serve all runs"""
+
+    # Only bookkeeping, not worth a trip to the executor for async runs
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, _Run] = {}
+        # Per agent executor run: when its current step started
+        self._steps: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, name: str, prompt: Optional[str] = None):
+        with self._lock:
+            self._runs[run_id] = _Run(name, time.perf_counter(), prompt)
+
+    def _end(self, run_id: UUID) -> Tuple[Optional[_Run], float]:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        return run, (time.perf_counter() - run.started if run is not None else 0.0)
+
+    # Chains
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, _class_name(serialized))
+        with self._lock:
+            self._steps[run_id] = time.perf_counter()
+
+    def on_chain_end(self, outputs: Dict[str, Any], *, run_id: UUID, **kwargs: Any) -> None:
+        run, seconds = self._end(run_id)
+        with self._lock:
+            self._steps.pop(run_id, None)
+        if run is not None:
+            CHAIN_SECONDS.labels(run.name, 'ok').observe(seconds)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run, seconds = self._end(run_id)
+        with self._lock:
+            self._steps.pop(run_id, None)
+        if run is not None:
+            CHAIN_SECONDS.labels(run.name, 'error').observe(seconds)
+            ERRORS.labels('chain', run.name, type(error).__name__).inc()
+
+    # Agent steps
+
+    def _step(self, run_id: UUID, action: str):
+        with self._lock:
+            started = self._steps.get(run_id)
+        if started is not None:
+            AGENT_STEP_SECONDS.labels(action).observe(time.perf_counter() - started)
+
+    def on_agent_action(self, action: AgentAction, *, run_id: UUID, **kwargs: Any) -> None:
+        self._step(run_id, action.tool)
+
+    def on_agent_finish(self, finish: AgentFinish, *, run_id: UUID, **kwargs: Any) -> None:
+        self._step(run_id, 'finish')
+
+    # Tools
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, serialized.get('name') or 'unknown')
+
+    def _tool_done(self, run_id: UUID, parent_run_id: Optional[UUID]) -> Tuple[Optional[_Run], float]:
+        run, seconds = self._end(run_id)
+        # The agent's next step starts now
+        with self._lock:
+            if parent_run_id in self._steps:
+                self._steps[parent_run_id] = time.perf_counter()
+        return run, seconds
+
+    def on_tool_end(self, output: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        run, seconds = self._tool_done(run_id, parent_run_id)
+        if run is not None:
+            TOOL_SECONDS.labels(run.name, 'ok').observe(seconds)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        run, seconds = self._tool_done(run_id, parent_run_id)
+        if run is not None:
+            TOOL_SECONDS.labels(run.name, 'error').observe(seconds)
+            ERRORS.labels('tool', run.name, type(error).__name__).inc()
+
+    # LLM calls
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, invocation_params: Optional[dict] = None, **kwargs: Any) -> None:
+        self._start(run_id, _model_name(serialized, invocation_params), '\n'.join(prompts))
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID, invocation_params: Optional[dict] = None, **kwargs: Any) -> None:
+        prompt = '\n'.join(m.content for batch in messages for m in batch)
+        self._start(run_id, _model_name(serialized, invocation_params), prompt)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run, seconds = self._end(run_id)
+        if run is None:
+            return
+        LLM_SECONDS.labels(run.name, 'ok').observe(seconds)
+
+        usage = (response.llm_output or {}).get('token_usage') or {}
+        prompt_tokens = usage.get('prompt_tokens')
+        completion_tokens = usage.get('completion_tokens')
+        # Streaming responses come without usage
+        if prompt_tokens is None:
+            prompt_tokens = _count_tokens(run.name, run.prompt or '')
+        if completion_tokens is None:
+            completion_tokens = _count_tokens(run.name, ''.join(g.text for gens in response.generations for g in gens))
+
+        if prompt_tokens is not None:
+            LLM_TOKENS.labels(run.name, 'prompt').inc(prompt_tokens)
+        if completion_tokens is not None:
+            LLM_TOKENS.labels(run.name, 'completion').inc(completion_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run, seconds = self._end(run_id)
+        if run is not None:
+            LLM_SECONDS.labels(run.name, 'error').observe(seconds)
+            ERRORS.labels('llm', run.name, type(error).__name__).inc()
+
+
+_metrics_handler: Optional[MetricsCallbackHandler] = None
+_metrics_handler_lock = threading.Lock()
+
+
+def get_metrics_callback_handler() -> MetricsCallbackHandler:
+    """The metrics handler shared by every chain in this process"""
+    global _metrics_handler
+    if _metrics_handler is None:
+        with _metrics_handler_lock:
+            if _metrics_handler is None:
+                _metrics_handler = MetricsCallbackHandler()
+    return _metrics_handler
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """(body, content type) of the metrics in Prometheus text format, of all workers if multiprocess"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
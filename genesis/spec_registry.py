@@ -0,0 +1,169 @@
+"""Process-wide registry of parsed OpenAPI specs and their operations.
+
+Parsing `genesis_openapi.yaml` (or fetching it over HTTP) and validating it
+into an `OpenAPISpec` is by far the most expensive part of building an agent.
+Specs are parsed once per process and reused until the source changes: a
+file's modification time and size, or a URL's ETag / Last-Modified validators.
+`APIOperation`s built from a registered spec are memoized alongside it. Spec
+files can also be loaded from a precompiled snapshot (see `spec_snapshot`).
+"""
+
+import time
+import threading
+from pathlib import Path
+
+import requests
+
+from langchain.tools.openapi.utils.api_models import APIOperation
+from langchain.tools.openapi.utils.openapi_utils import OpenAPISpec
+
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+from .spec_snapshot import Operations, load_snapshot
+
+
+SPEC_FETCH_TIMEOUT = 10.0
+"""Seconds to wait for a spec server (connecting and each read)"""
+
+
+class _SpecEntry:
+    __slots__ = ('spec', 'version', 'checked_at', 'operations')
+
+    def __init__(self, spec: OpenAPISpec, version: Hashable):
+        self.spec = spec
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.operations: Dict[Tuple[str, str], APIOperation] = {}
+
+
+class SpecRegistry:
+    """Parsed specs keyed by source, revalidated against the source's version"""
+
+    def __init__(self):
+        self.parses = 0
+        self.snapshot_loads = 0
+        self.reuses = 0
+
+        self._entries: Dict[str, _SpecEntry] = {}
+        # URLs being fetched (without the lock held)
+        self._fetching: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def _store(self, source: str, spec: OpenAPISpec, version: Hashable) -> OpenAPISpec:
+        self.parses += 1
+        self._entries[source] = _SpecEntry(spec, version)
+        return spec
+
+    def _store_snapshot(self, source: str, spec: OpenAPISpec, operations: Operations, version: Hashable) -> OpenAPISpec:
+        self.snapshot_loads += 1
+        entry = _SpecEntry(spec, version)
+        entry.operations.update(operations)
+        self._entries[source] = entry
+        return spec
+
+    def _reuse(self, entry: _SpecEntry) -> OpenAPISpec:
+        self.reuses += 1
+        entry.checked_at = time.monotonic()
+        return entry.spec
+
+    def from_file(self, path: str, snapshot_path: Optional[str] = None) -> OpenAPISpec:
+        """Spec in the file at `path`, from the precompiled snapshot if given and still fresh"""
+        source = str(Path(path).resolve())
+        stat = Path(source).stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(source)
+            if entry is not None and entry.version == version:
+                return self._reuse(entry)
+            if snapshot_path is not None:
+                snapshot = load_snapshot(source, snapshot_path)
+                if snapshot is not None:
+                    return self._store_snapshot(source, *snapshot, version)
+            return self._store(source, OpenAPISpec.from_file(source), version)
+
+    def from_url(self, url: str, revalidate_interval: float = 60.0, timeout: float = SPEC_FETCH_TIMEOUT) -> OpenAPISpec:
+        """Spec at `url`. After `revalidate_interval` seconds, a conditional GET checks it is unchanged.
+
+        The request is made without holding the registry lock, so a slow spec
+        server never blocks other specs or operation lookups. While a URL is
+        being revalidated, other callers keep getting the spec it had.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and (time.monotonic() - entry.checked_at < revalidate_interval or url in self._fetching):
+                return self._reuse(entry)
+            self._fetching.add(url)
+
+        try:
+            headers = {}
+            if entry is not None:
+                etag, last_modified = entry.version
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+
+            try:
+                response = requests.get(url, headers=headers, timeout=timeout)
+                if entry is not None and response.status_code == 304:
+                    with self._lock:
+                        return self._reuse(entry)
+                response.raise_for_status()
+            except requests.RequestException:
+                # Keep serving the last good spec while the server is unreachable
+                if entry is not None:
+                    with self._lock:
+                        return self._reuse(entry)
+                raise
+
+            version = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            spec = OpenAPISpec.from_text(response.text)
+            with self._lock:
+                return self._store(url, spec, version)
+        finally:
+            with self._lock:
+                self._fetching.discard(url)
+
+    def get_operation(self, spec: OpenAPISpec, path: str, method: str) -> APIOperation:
+        """`APIOperation.from_openapi_spec`, memoized for specs from this registry"""
+        with self._lock:
+            entry = next((e for e in self._entries.values() if e.spec is spec), None)
+            if entry is None:
+                return APIOperation.from_openapi_spec(spec, path, method)
+            operation = entry.operations.get((path, method))
+            if operation is None:
+                operation = APIOperation.from_openapi_spec(spec, path, method)
+                entry.operations[(path, method)] = operation
+            return operation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'specs': len(self._entries),
+                'operations': sum(len(e.operations) for e in self._entries.values()),
+                'parses': self.parses,
+                'snapshot_loads': self.snapshot_loads,
+                'reuses': self.reuses,
+            }
+
+
+_spec_registry: Optional[SpecRegistry] = None
+_spec_registry_lock = threading.Lock()
+
+
+def get_spec_registry() -> SpecRegistry:
+    """The registry shared by every agent built in this process"""
+    global _spec_registry
+    if _spec_registry is None:
+        with _spec_registry_lock:
+            if _spec_registry is None:
+                _spec_registry = SpecRegistry()
+    return _spec_registry
+
+
+def get_api_operation(spec: OpenAPISpec, path: str, method: str) -> APIOperation:
+    return get_spec_registry().get_operation(spec, path, method)
@@ -0,0 +1,109 @@
+"""Precompiled snapshot of the Genesis OpenAPI spec, for fast cold starts.
+
+Parsing the YAML and validating it into an `OpenAPISpec` takes tens of
+milliseconds in every worker and CLI start. The snapshot is the validated spec
+and all its `APIOperation`s pickled at build time, along with the SHA-256 of
+the source file and the langchain/pydantic versions that produced it. It is
+only used when all of those still match.
+
+Build it with:
+    python -m genesis.spec_snapshot [genesis_openapi.yaml] [-o .cache/genesis_openapi.snapshot]
+
+Only load snapshots you built yourself, it is a pickle.
+"""
+
+import os
+import time
+import pickle
+import hashlib
+import argparse
+from pathlib import Path
+
+import pydantic
+import langchain
+
+from langchain.tools.openapi.utils.api_models import APIOperation
+from langchain.tools.openapi.utils.openapi_utils import OpenAPISpec
+
+from typing import Dict, Optional, Tuple
+
+
+SNAPSHOT_FORMAT = 1
+DEFAULT_SNAPSHOT_PATH = '.cache/genesis_openapi.snapshot'
+
+_HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+Operations = Dict[Tuple[str, str], APIOperation]
+
+
+def _source_hash(spec_path: str) -> str:
+    return hashlib.sha256(Path(spec_path).read_bytes()).hexdigest()
+
+
+def _header(spec_path: str) -> dict:
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'source_sha256': _source_hash(spec_path),
+        'langchain': langchain.__version__,
+        'pydantic': pydantic.VERSION,
+    }
+
+
+def all_operations(spec: OpenAPISpec) -> Operations:
+    """Every operation of the spec that langchain can build"""
+    operations = {}
+    for path, path_item in (spec.paths or {}).items():
+        for method in _HTTP_METHODS:
+            if getattr(path_item, method, None) is None:
+                continue
+            try:
+                operations[(path, method)] = APIOperation.from_openapi_spec(spec, path, method)
+            except (ValueError, NotImplementedError):
+                # Unsupported by langchain, the tools don't use it either
+                continue
+    return operations
+
+
+def build_snapshot(spec_path: str, snapshot_path: str = DEFAULT_SNAPSHOT_PATH) -> Tuple[OpenAPISpec, Operations]:
+    spec = OpenAPISpec.from_file(spec_path)
+    operations = all_operations(spec)
+
+    os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+    tmp_path = snapshot_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        # Header first, so a stale snapshot is rejected without unpickling the rest
+        pickle.dump(_header(spec_path), f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump((spec, operations), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+    return spec, operations
+
+
+def load_snapshot(spec_path: str, snapshot_path: str = DEFAULT_SNAPSHOT_PATH) -> Optional[Tuple[OpenAPISpec, Operations]]:
+    """The snapshotted spec and operations, or None if missing or stale"""
+    try:
+        with open(snapshot_path, 'rb') as f:
+            if pickle.load(f) != _header(spec_path):
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the precompiled Genesis OpenAPI spec snapshot')
+    parser.add_argument('spec', nargs='?', default='genesis_openapi.yaml', help='OpenAPI spec file')
+    parser.add_argument('-o', '--output', default=DEFAULT_SNAPSHOT_PATH, help='Snapshot file to write')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    OpenAPISpec.from_file(args.spec)
+    parse_seconds = time.perf_counter() - start
+
+    _, operations = build_snapshot(args.spec, args.output)
+
+    start = time.perf_counter()
+    assert load_snapshot(args.spec, args.output) is not None
+    load_seconds = time.perf_counter() - start
+
+    print('Wrote %s (%d operations, %d bytes)' % (args.output, len(operations), os.path.getsize(args.output)))
+    print('Spec load: %.1fms parsed, %.1fms from snapshot' % (parse_seconds * 1000, load_seconds * 1000))
@@ -0,0 +1,83 @@
+"""Agent runs as a stream of events, for server-sent-event endpoints.
+
+A run emits `start`, then any number of `token`, `tool_start` and `tool_end`
+events, then exactly one of `final` or `error`. Events go through a bounded
+queue that the callbacks await on, so a slow client slows the agent down
+instead of growing memory, and closing the stream cancels the run.
+"""
+
+import json
+import asyncio
+
+from langchain.callbacks.base import AsyncCallbackHandler
+from langchain.callbacks.manager import Callbacks
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, NamedTuple, Union
+
+
+class StreamEvent(NamedTuple):
+    event: str
+    data: Dict[str, Any]
+
+    def to_sse(self) -> str:
+        return 'event: %s\ndata: %s\n\n' % (self.event, json.dumps(self.data))
+
+
+class QueueEventCallbackHandler(AsyncCallbackHandler):
+    """Puts tokens and tool calls on an asyncio queue, waiting when it is full"""
+
+    def __init__(self, queue: 'asyncio.Queue[StreamEvent]'):
+        self.queue = queue
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        await self.queue.put(StreamEvent('token', {'token': token}))
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        await self.queue.put(StreamEvent('tool_start', {'tool': serialized.get('name'), 'input': input_str}))
+
+    async def on_tool_end(self, output: str, **kwargs: Any) -> None:
+        await self.queue.put(StreamEvent('tool_end', {'output': output}))
+
+    async def on_tool_error(self, error: Union[Exception, KeyboardInterrupt], **kwargs: Any) -> None:
+        await self.queue.put(StreamEvent('tool_end', {'error': str(error)}))
+
+
+async def stream_run_events(run: Callable[[Callbacks], Awaitable[str]],
+                            max_queued_events: int = 256) -> AsyncIterator[StreamEvent]:
+    """Run `run(callbacks)` and yield its events as they happen.
+
+    The run is cancelled if the consumer stops iterating (eg: the client
+    disconnected), so no LLM tokens are paid for that nobody reads.
+    """
+    queue: 'asyncio.Queue[StreamEvent]' = asyncio.Queue(maxsize=max_queued_events)
+    task = asyncio.ensure_future(run([QueueEventCallbackHandler(queue)]))
+    next_event = None
+    try:
+        yield StreamEvent('start', {})
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(queue.get())
+            await asyncio.wait([next_event, task], return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield next_event.result()
+                next_event = None
+            elif task.done():
+                break
+
+        # Events queued before the run finished
+        next_event.cancel()
+        next_event = None
+        while not queue.empty():
+            yield queue.get_nowait()
+
+        if task.cancelled():
+            yield StreamEvent('error', {'error': 'The run was cancelled'})
+        elif task.exception() is not None:
+            yield StreamEvent('error', {'error': str(task.exception())})
+        else:
+            yield StreamEvent('final', {'output': task.result()})
+    finally:
+        if next_event is not None:
+            next_event.cancel()
+        if not task.done():
+            task.cancel()
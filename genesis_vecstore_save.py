@@ -1,12 +1,12 @@
-# WARNING! It does NOT clear previous data nor does it UPSERT. You need to manually
-# clear the collection called 'genesis' in the vectorstore and then run this.
+# WARNING! By default it clears ALL previous data and re-inserts everything. Pass
+# `--sync` to only embed new/changed documents and delete the ones that disappeared.
 
 
 def _patch_langchain():
     from typing import Optional, List
     from langchain.vectorstores.pgvector import PGVector
     from sqlalchemy.orm import Session
-    from sqlalchemy import delete
+    from sqlalchemy import delete, select
 
     def _delete_embeddings(self, ids: List[str] = None) -> None:
         with Session(self._conn) as session:
@@ -18,8 +18,20 @@ def _patch_langchain():
             session.execute(query)
             session.commit()
 
+    def _get_embedding_ids(self) -> List[str]:
+        with Session(self._conn) as session:
+            collection = self.get_collection(session)
+            if collection is None:
+                return []
+            query = select(self.EmbeddingStore.custom_id).where(
+                self.EmbeddingStore.collection_id == collection.uuid
+            )
+            return [custom_id for (custom_id,) in session.execute(query)]
+
     if not hasattr(PGVector, "delete_embeddings"):
         setattr(PGVector, "delete_embeddings", _delete_embeddings)
+    if not hasattr(PGVector, "get_embedding_ids"):
+        setattr(PGVector, "get_embedding_ids", _get_embedding_ids)
 
 
 _patch_langchain()
@@ -30,22 +42,26 @@ from pydantic import BaseModel, Field, Extra
 from pydantic_yaml import to_yaml_str
 
 import enum
+import json
 import tqdm
+import hashlib
+import asyncio
+import argparse
 import itertools
 from datetime import timedelta
+from collections import Counter
 from urllib.parse import urljoin
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Tuple, Iterator
 
 from requests_cache import CachedSession, SQLiteCache
+from langchain.vectorstores.base import VectorStore
 
-from vectorstores.doc_chroma import chromadb
-from vectorstores.genesis_pg import genesisdb
+from vectorstores.registry import get_vectorstore
 from genesis.config import GenesisSettings
+from genesis.answer_cache import mark_genesis_snapshot
 
 
-_settings = GenesisSettings()
-
-VECTORSTORE = genesisdb
+VECTORSTORE_NAME = "genesisdb"
 
 GENESIS_BASE_URL = "https://api.phaidelta.com/backend"
 GENESIS_TWC_WARLVL_ID = 10
@@ -54,6 +70,9 @@ CACHE_PATH = ".cache/requests.db"
 REQUESTS_CACHE = SQLiteCache(db_path=CACHE_PATH, wal=True)
 REQUESTS_CACHE_EXPIRY = timedelta(minutes=3)
 
+SCRAPE_CONCURRENCY = 16
+"""Maximum number of in-flight requests when crawling asynchronously"""
+
 
 class LiveServerSession(CachedSession):
     """Session with base url"""
@@ -71,8 +90,57 @@ def make_batches(items: List, batch_size: int = 1) -> List:
     return [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
 
 
+def document_id(doc: Document) -> str:
+    """Stable id of a document: the entity it describes plus a hash of its content"""
+    content_hash = hashlib.sha1(
+        json.dumps(
+            [doc.page_content, doc.metadata], sort_keys=True, default=str
+        ).encode()
+    ).hexdigest()
+    return "%s#%s" % (doc.metadata.get("entity", ""), content_hash)
+
+
+def _get_document_ids(store: VectorStore) -> List[str]:
+    if hasattr(store, "get_embedding_ids"):
+        return store.get_embedding_ids()
+    return store._collection.get(include=[])["ids"]
+
+
+def _delete_documents(store: VectorStore, ids: List[str]) -> None:
+    if hasattr(store, "delete_embeddings"):
+        store.delete_embeddings(ids)
+    else:
+        store.delete(ids)
+
+
+def sync_documents(
+    store: VectorStore, docs: List[Document], batch_size: int = 8
+) -> Tuple[int, int, int]:
+    """Upsert documents by their stable id.
+
+    Only documents whose id is not already stored are embedded and written, and
+    only stored ids that are no longer produced are deleted. New documents are
+    written before stale ones are removed, so readers never see a gap.
+
+    Returns the number of (added, deleted, unchanged) documents.
+    """
+    docs_by_id = {document_id(doc): doc for doc in docs}
+    existing_ids = set(_get_document_ids(store))
+
+    new_ids = [doc_id for doc_id in docs_by_id if doc_id not in existing_ids]
+    stale_ids = [doc_id for doc_id in existing_ids if doc_id not in docs_by_id]
+
+    for batch in tqdm.tqdm(make_batches(new_ids, batch_size), unit="batch"):
+        store.add_documents([docs_by_id[doc_id] for doc_id in batch], ids=batch)
+
+    if len(stale_ids) > 0:
+        _delete_documents(store, stale_ids)
+
+    return len(new_ids), len(stale_ids), len(docs_by_id) - len(new_ids)
+
+
 # Call first time
-# VECTORSTORE.create_collection()
+# get_vectorstore(VECTORSTORE_NAME).create_collection()
 
 
 class MakeDocsMixin:
@@ -86,6 +154,7 @@ class MakeDocsMixin:
                 metadata={
                     "source": self._doc_source_template,
                     "content_type": "yaml",
+                    "entity": self._doc_entity_key,
                     **self._additional_metadata(),
                 },
             )
@@ -136,6 +205,16 @@ class GenesisSensorSummary(
             else "%s" % self.sensor_unit_at.unit_alias,
         )
 
+    @property
+    def _doc_entity_key(self) -> str:
+        return "location/%d/unit/%d/sensor/%s" % (
+            self.sensor_location_at.location_id,
+            self.sensor_unit_at.unit_id,
+            self.sensor_id
+            if self.sensor_id is not None
+            else self.sensor_given_name,
+        )
+
     def _additional_metadata(self) -> dict:
         return {
             "description": "Sensors in warehouses and units of TWC",  # inside warehouse location"# %s%s" % (
@@ -172,6 +251,13 @@ class GenesisUnitSummary(
             else " (%s)" % self.unit_location_at.location_alias,
         )
 
+    @property
+    def _doc_entity_key(self) -> str:
+        return "location/%d/unit/%d" % (
+            self.unit_location_at.location_id,
+            self.unit_id,
+        )
+
     def _additional_metadata(self) -> dict:
         return {
             "description": "Unit inside warehouse location %s%s"
@@ -232,6 +318,10 @@ class GenesisLocation(
             "" if not self.location_alias else " (%s)" % self.location_alias,
         )
 
+    @property
+    def _doc_entity_key(self) -> str:
+        return "location/%d" % self.location_id
+
     def to_documents(self) -> List[Document]:
         return list(
             itertools.chain(
@@ -269,12 +359,17 @@ class Genesis(BaseModel):
                 metadata={
                     "source": self._doc_source_template.format(**self.metadata.dict()),
                     "content_type": "yaml",
+                    "entity": "genesis",
                 },
             ),
             *itertools.chain(*map(GenesisLocation.to_documents, self.locations)),
         ]
 
 
+class _CountsContent(BaseModel, extra=Extra.allow):
+    pass
+
+
 class DataCounts(MakeDocsMixin, BaseModel):
     all_warehouses: dict
     description: str
@@ -284,118 +379,204 @@ class DataCounts(MakeDocsMixin, BaseModel):
     def _doc_source_template(self) -> str:
         return "Genesis Warehouse Location: TWC - totals & number of warehouse, unit and sensor"
 
+    @property
+    def _doc_entity_key(self) -> str:
+        return "counts"
+
+    def _counts_document(self, entity: str, source: str, description: str, content: dict) -> Document:
+        return Document(
+            page_content=to_yaml_str(_CountsContent.parse_obj(content)),
+            metadata={
+                "source": source,
+                "content_type": "yaml",
+                "entity": entity,
+                "description": description,
+                "type": "genesis/counts",
+            },
+        )
+
+    def to_documents(self) -> List[Document]:
+        """The fleet totals, then the counts of each warehouse and each unit, as separate documents.
+
+        Sensor type breakdowns get a document per type.
+
+        The embedding model only reads the first ~256 tokens of a document, and
+        retrieved documents go whole into the prompt, so each one stays small.
+        """
+        fleet_totals = dict(self.all_warehouses)
+        fleet_sensor_types = fleet_totals.pop("count_sensors_by_type", {})
+        documents = [
+            self._counts_document(
+                self._doc_entity_key,
+                self._doc_source_template,
+                self.description,
+                {"all_warehouses": fleet_totals},
+            ),
+            *(
+                self._counts_document(
+                    "%s/sensor_type/%s" % (self._doc_entity_key, sensor_type),
+                    "Genesis Warehouse Location: TWC - number of %s sensors" % sensor_type,
+                    "Number of %s sensors of each subtype in all warehouses, also grouped by state" % sensor_type,
+                    {"all_warehouses": {"count_sensors_by_type": {sensor_type: counts}}},
+                )
+                for sensor_type, counts in fleet_sensor_types.items()
+            ),
+        ]
+
+        for warehouse_label, warehouse_counts in self.warehouse.items():
+            warehouse_totals = dict(warehouse_counts)
+            location_id = warehouse_totals.pop("location_id")
+            unit_counts = warehouse_totals.pop("units", {})
+            sensor_types = warehouse_totals.pop("count_sensors_by_type", {})
+            warehouse_entity = "%s/location/%d" % (self._doc_entity_key, location_id)
+            documents.append(self._counts_document(
+                warehouse_entity,
+                "Genesis Warehouse Location: TWC/%s - totals & number of units and sensors" % warehouse_label,
+                "Totals and number of units and sensors in warehouse %s, also grouped by state" % warehouse_label,
+                {"warehouse": {warehouse_label: warehouse_totals}},
+            ))
+            for sensor_type, counts in sensor_types.items():
+                documents.append(self._counts_document(
+                    "%s/sensor_type/%s" % (warehouse_entity, sensor_type),
+                    "Genesis Warehouse Location: TWC/%s - number of %s sensors" % (warehouse_label, sensor_type),
+                    "Number of %s sensors of each subtype in warehouse %s, also grouped by state" % (sensor_type, warehouse_label),
+                    {"warehouse": {warehouse_label: {"count_sensors_by_type": {sensor_type: counts}}}},
+                ))
+            for unit_label, counts in unit_counts.items():
+                documents.append(self._counts_document(
+                    "%s/unit/%d" % (warehouse_entity, counts["unit_id"]),
+                    "Genesis Warehouse-level Unit Summary: TWC/%s/%s - number of sensors" % (warehouse_label, unit_label),
+                    "Number of sensors of unit %s in warehouse %s, by state and type" % (unit_label, warehouse_label),
+                    {"warehouse": warehouse_label, "unit": {unit_label: counts}},
+                ))
+
+        return documents
+
+
+_STATE_COUNT_KEYS = {
+    GenesisItemState.NORMAL: "count_normal",
+    GenesisItemState.OUT_OF_RANGE: "count_out_of_range",
+    GenesisItemState.INACTIVE: "count_inactive",
+}
+
+
+def _state_counts(states: Counter) -> dict:
+    return {key: states[state] for state, key in _STATE_COUNT_KEYS.items()}
+
+
+def _states_of(sensor_kinds: Counter) -> Counter:
+    """Fold a (type, subtype, state) counter into a per-state counter"""
+    states = Counter()
+    for (_, _, state), num in sensor_kinds.items():
+        states[state] += num
+    return states
+
+
+def _sensor_kinds(sensors: List[GenesisSensorSummary]) -> Counter:
+    return Counter(
+        (sensor.sensor_type, sensor.sensor_subtype, sensor.sensor_health_state)
+        for sensor in sensors
+    )
+
+
+def _sensor_type_breakdown(sensor_kinds: Counter) -> dict:
+    """Nest a (type, subtype, state) counter as type -> subtype with per-state counts"""
+    breakdown = {}
+    for (sensor_type, sensor_subtype, state), num in sorted(sensor_kinds.items()):
+        type_entry = breakdown.setdefault(
+            sensor_type,
+            {"total": 0, **dict.fromkeys(_STATE_COUNT_KEYS.values(), 0), "by_subtype": {}},
+        )
+        subtype_entry = type_entry["by_subtype"].setdefault(
+            sensor_subtype, {"total": 0, **dict.fromkeys(_STATE_COUNT_KEYS.values(), 0)}
+        )
+        for entry in (type_entry, subtype_entry):
+            entry["total"] += num
+            entry[_STATE_COUNT_KEYS[state]] += num
+    return breakdown
+
+
+def _location_label(location: GenesisLocationBase) -> str:
+    return location.location_name + (
+        " (%s)" % location.location_alias if location.location_alias is not None else ""
+    )
+
+
+def _unit_label(unit: GenesisUnitBase) -> str:
+    return unit.unit_name + (
+        " (%s)" % unit.unit_alias if unit.unit_alias is not None else ""
+    )
+
 
 def genesis_counting(model: Genesis):
+    """Totals and breakdowns of the whole fleet, computed in one pass over it.
+
+    Every sensor is visited exactly once and tallied by (type, subtype, state).
+    The per-unit, per-warehouse and fleet-wide figures are folded from those
+    small counters.
+    """
+    fleet_location_states = Counter()
+    fleet_unit_states = Counter()
+    fleet_sensor_kinds = Counter()
+    warehouse_counts = {}
+
+    for warehouse in model.locations:
+        fleet_location_states[warehouse.location_health_state] += 1
+
+        warlvl_sensor_kinds = _sensor_kinds(warehouse.warehouse_sensors)
+        all_sensor_kinds = Counter(warlvl_sensor_kinds)
+        unit_states = Counter()
+        unit_counts = {}
+
+        for unit in warehouse.warehouse_units:
+            unit_states[unit.unit_health_state] += 1
+            unit_sensor_kinds = _sensor_kinds(unit.unit_sensors)
+            all_sensor_kinds.update(unit_sensor_kinds)
+
+            sensors_by_type = Counter()
+            for (sensor_type, _, _), num in unit_sensor_kinds.items():
+                sensors_by_type[sensor_type] += num
+
+            unit_label = _unit_label(unit)
+            if unit_label in unit_counts:
+                unit_label = "%s [%d]" % (unit_label, unit.unit_id)
+            unit_counts[unit_label] = {
+                "unit_id": unit.unit_id,
+                "unit_health_state": unit.unit_health_state,
+                "total_sensors": len(unit.unit_sensors),
+                "count_sensors_by_state": _state_counts(_states_of(unit_sensor_kinds)),
+                "count_sensors_by_type": dict(sorted(sensors_by_type.items())),
+            }
+
+        fleet_unit_states.update(unit_states)
+        fleet_sensor_kinds.update(all_sensor_kinds)
+
+        warehouse_counts[_location_label(warehouse)] = {
+            "location_id": warehouse.location_id,
+            "total_warehouse_sensors": len(warehouse.warehouse_sensors),
+            "total_warehouse_units": len(warehouse.warehouse_units),
+            "total_sensors_in_warehouse_and_all_units": sum(all_sensor_kinds.values()),
+            "count_warehouse_sensors_by_state": _state_counts(
+                _states_of(warlvl_sensor_kinds)
+            ),
+            "count_warehouse_units_by_state": _state_counts(unit_states),
+            "count_all_sensors_by_state": _state_counts(_states_of(all_sensor_kinds)),
+            "count_sensors_by_type": _sensor_type_breakdown(all_sensor_kinds),
+            "units": unit_counts,
+        }
+
     return {
-        "description": "All totals, counts of, total number of sensors at, units, warehouses, also grouped by state. Unit normal/inactive count, number of sensors",
+        "description": "All totals, counts of, total number of sensors at, units, warehouses, also grouped by state. Unit normal/inactive count, number of sensors, sensors by type/subtype and per unit",
         "all_warehouses": {
             "total": len(model.locations),
-            "count_warehouses_by_state": {
-                "count_normal": len(
-                    list(
-                        filter(
-                            lambda x: x.location_health_state
-                            == GenesisItemState.NORMAL,
-                            model.locations,
-                        )
-                    )
-                ),
-                "count_out_of_range": len(
-                    list(
-                        filter(
-                            lambda x: x.location_health_state
-                            == GenesisItemState.OUT_OF_RANGE,
-                            model.locations,
-                        )
-                    )
-                ),
-                "count_inactive": len(
-                    list(
-                        filter(
-                            lambda x: x.location_health_state
-                            == GenesisItemState.INACTIVE,
-                            model.locations,
-                        )
-                    )
-                ),
-            },
-        },
-        "warehouse": {
-            (
-                warehouse.location_name
-                + (
-                    f" (warehouse.location_alias)"
-                    if warehouse.location_alias is not None
-                    else ""
-                )
-            ): {
-                "total_warehouse_sensors": len(warehouse.warehouse_sensors),
-                "total_warehouse_units": len(warehouse.warehouse_units),
-                "total_sensors_in_warehouse_and_all_units": sum(
-                    len(unit.unit_sensors) for unit in warehouse.warehouse_units
-                )
-                + len(warehouse.warehouse_sensors),
-                "count_warehouse_sensors_by_state": {
-                    "count_normal": len(
-                        list(
-                            filter(
-                                lambda x: x.sensor_health_state
-                                == GenesisItemState.NORMAL,
-                                warehouse.warehouse_sensors,
-                            )
-                        )
-                    ),
-                    "count_out_of_range": len(
-                        list(
-                            filter(
-                                lambda x: x.sensor_health_state
-                                == GenesisItemState.OUT_OF_RANGE,
-                                warehouse.warehouse_sensors,
-                            )
-                        )
-                    ),
-                    "count_inactive": len(
-                        list(
-                            filter(
-                                lambda x: x.sensor_health_state
-                                == GenesisItemState.INACTIVE,
-                                warehouse.warehouse_sensors,
-                            )
-                        )
-                    ),
-                },
-                "count_warehouse_units_by_state": {
-                    "count_normal": len(
-                        list(
-                            filter(
-                                lambda x: x.unit_health_state
-                                == GenesisItemState.NORMAL,
-                                warehouse.warehouse_units,
-                            )
-                        )
-                    ),
-                    "count_out_of_range": len(
-                        list(
-                            filter(
-                                lambda x: x.unit_health_state
-                                == GenesisItemState.OUT_OF_RANGE,
-                                warehouse.warehouse_units,
-                            )
-                        )
-                    ),
-                    "count_inactive": len(
-                        list(
-                            filter(
-                                lambda x: x.unit_health_state
-                                == GenesisItemState.INACTIVE,
-                                warehouse.warehouse_units,
-                            )
-                        )
-                    ),
-                },
-            }
-            for warehouse in model.locations
+            "count_warehouses_by_state": _state_counts(fleet_location_states),
+            "total_units": sum(fleet_unit_states.values()),
+            "count_units_by_state": _state_counts(fleet_unit_states),
+            "total_sensors": sum(fleet_sensor_kinds.values()),
+            "count_sensors_by_state": _state_counts(_states_of(fleet_sensor_kinds)),
+            "count_sensors_by_type": _sensor_type_breakdown(fleet_sensor_kinds),
         },
+        "warehouse": warehouse_counts,
     }
 
 
@@ -437,6 +618,90 @@ def scrape_all_genesis(sess: LiveServerSession) -> dict:
         return raw_responses
 
 
+async def async_scrape_all_genesis(
+    base_url: str,
+    headers: Optional[dict] = None,
+    concurrency: int = SCRAPE_CONCURRENCY,
+) -> dict:
+    """Concurrent scrape of all data from APIs of Genesis.
+
+    Every warehouse is crawled as its own task, so its units are requested as
+    soon as its warehouse response arrives. At most `concurrency` requests are
+    in flight at once, over keep-alive connections pooled per host. Returns the
+    same structure as `scrape_all_genesis`.
+    """
+    import aiohttp
+
+    raw_responses = {}
+    url_base = base_url.rstrip("/") + "/"
+    semaphore = asyncio.Semaphore(concurrency)
+    progress = tqdm.tqdm(unit="request")
+
+    async def fetch(session: aiohttp.ClientSession, url: str):
+        async with semaphore:
+            async with session.get(urljoin(url_base, url.lstrip("/"))) as resp:
+                resp.raise_for_status()
+                data = await resp.json(content_type=None)
+        progress.update()
+        return data
+
+    async def crawl_unit(session: aiohttp.ClientSession, loc_id, unit_id):
+        raw_responses["units"][unit_id] = await fetch(
+            session,
+            "/metrics/warehouse/{warehouse_id}/unit/{unit_id}".format(
+                warehouse_id=loc_id, unit_id=unit_id
+            ),
+        )
+
+    async def crawl_warehouse(session: aiohttp.ClientSession, loc_id):
+        loc_summary_task = asyncio.ensure_future(
+            fetch(
+                session, "/locations/{warehouse_id}/summary".format(warehouse_id=loc_id)
+            )
+        )
+        try:
+            warlvl_details = await fetch(
+                session, "/metrics/warehouse/{warehouse_id}".format(warehouse_id=loc_id)
+            )
+            raw_responses["warehouses"][loc_id] = warlvl_details
+
+            await asyncio.gather(
+                *(
+                    crawl_unit(session, loc_id, unit["Unit Id"])
+                    for unit in warlvl_details["wv_unit_summary"]
+                )
+            )
+            raw_responses["location_summary"][loc_id] = await loc_summary_task
+        finally:
+            loc_summary_task.cancel()
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+
+    try:
+        async with aiohttp.ClientSession(
+            headers=headers, connector=connector
+        ) as session:
+            locs = await fetch(session, "/locations")
+
+            raw_responses["locations"] = locs
+            raw_responses["location_summary"] = {}  # Landing-level stuff
+            raw_responses["warehouses"] = {}  # Warehouse-level stuff
+            raw_responses["units"] = {}  # Unit-level stuff
+
+            warehouse_tasks = [
+                asyncio.ensure_future(crawl_warehouse(session, loc["id"]))
+                for loc in locs
+            ]
+            try:
+                await asyncio.gather(*warehouse_tasks)
+            finally:
+                for task in warehouse_tasks:
+                    task.cancel()
+    finally:
+        progress.close()
+        return raw_responses
+
+
 def _get_alt_sensor_type(sensor) -> Optional[str]:
     if sensor["Metric Sub-Type"] == "RH":
         return "Humidity"
@@ -446,124 +711,157 @@ def _get_alt_sensor_type(sensor) -> Optional[str]:
         return "VESDA/Smoke"
 
 
-def parse_genesis_apis(responses: dict):
-    parsed = {}
+def _normalize_sensor(sensor: dict, unit_at: dict, location_at: dict) -> dict:
+    return {
+        "sensor_id": sensor["Sensor Id"],
+        "sensor_type": sensor["Metric Type"],
+        "sensor_subtype": sensor["Metric Sub-Type"],
+        "sensor_given_name": sensor["Sensor Name"],
+        "sensor_value": sensor["Value"],
+        "sensor_measure_unit": sensor["Unit"],
+        "sensor_health_state": sensor["State"],
+        "sensor_unit_at": unit_at,
+        "sensor_location_at": location_at,
+    }
 
-    def find_loc_alias(loc) -> Optional[str]:
-        for unit in responses["warehouses"][loc["id"]]["wv_unit_summary"]:
-            if unit["Location Alias"]:
-                return unit["Location Alias"]
 
-    parsed["metadata"] = {
-        "website_owner": "phAIdelta",
-        "genesis_instance_owner": "The Warehouse Company (TWC)",
-    }
+def iter_genesis_locations(responses: dict) -> Iterator[dict]:
+    """Normalize scraped responses into location dicts, one warehouse at a time.
+
+    Per-location lookups (alias, location and warehouse-level unit references)
+    are computed once per warehouse and shared by all of its units and sensors,
+    so the whole fleet is normalized in a single pass.
+    """
+    for loc in responses["locations"]:
+        loc_id = loc["id"]
+        warlvl_details = responses["warehouses"][loc_id]
+        unit_summary = warlvl_details["wv_unit_summary"]
 
-    parsed["locations"] = [
-        {
-            "location_id": loc["id"],
+        loc_alias = next(
+            (unit["Location Alias"] for unit in unit_summary if unit["Location Alias"]),
+            None,
+        )
+        location_at = {
+            "location_id": loc_id,
             "location_name": loc["name"],
-            "location_coords": {
-                "latitude": loc["latitude"],
-                "longitude": loc["longitude"],
-            },
-            "location_health_state": loc["state"],
-            "location_alias": find_loc_alias(loc),
-            "location_summary": responses["location_summary"][loc["id"]],
-            "warehouse_sensors": [
-                {
-                    "sensor_id": sensor["Sensor Id"],
-                    "sensor_type": sensor["Metric Type"],
-                    "sensor_subtype": sensor["Metric Sub-Type"],
-                    "sensor_given_name": sensor["Sensor Name"],
-                    "sensor_value": sensor["Value"],
-                    "sensor_measure_unit": sensor["Unit"],
-                    "sensor_health_state": sensor["State"],
-                    "sensor_unit_at": {
-                        "unit_id": GENESIS_TWC_WARLVL_ID,
-                        "unit_name": "Warehouse-level unit",
-                        "unit_alias": "WARLVL (%s, %s)"
-                        % (loc["name"], find_loc_alias(loc) or ""),
-                    },
-                    "sensor_location_at": {
-                        "location_id": loc["id"],
-                        "location_name": loc["name"],
-                        "location_alias": find_loc_alias(loc),
+            "location_alias": loc_alias,
+        }
+        warlvl_unit_at = {
+            "unit_id": GENESIS_TWC_WARLVL_ID,
+            "unit_name": "Warehouse-level unit",
+            "unit_alias": "WARLVL (%s, %s)" % (loc["name"], loc_alias or ""),
+        }
+
+        warehouse_units = []
+        for unit in unit_summary:
+            unit_sensors = []
+            for sensor in responses["units"][unit["Unit Id"]]["uv_unit_metrics"]:
+                normalized_sensor = _normalize_sensor(
+                    sensor,
+                    {
+                        "unit_id": unit["Unit Id"],
+                        "unit_name": sensor["Unit Name"],
+                        "unit_alias": sensor["Unit Alias"],
                     },
-                }
-                for sensor in responses["warehouses"][loc["id"]]["wv_warehouse_metrics"]
-            ],
-            "warehouse_units": [
+                    location_at,
+                )
+                normalized_sensor["sensor_type_alt"] = _get_alt_sensor_type(sensor)
+                unit_sensors.append(normalized_sensor)
+
+            warehouse_units.append(
                 {
                     "unit_id": unit["Unit Id"],
                     "unit_name": unit["Unit Name"],
                     "unit_alias": unit["Unit Alias"],
                     "unit_health_state": unit["State"],
                     "unit_sensors_out_count": unit["Value"],
-                    "unit_location_at": {
-                        "location_id": loc["id"],
-                        "location_name": loc["name"],
-                        "location_alias": find_loc_alias(loc),
-                    },
-                    "unit_sensors": [
-                        {
-                            "sensor_id": sensor["Sensor Id"],
-                            "sensor_type": sensor["Metric Type"],
-                            "sensor_subtype": sensor["Metric Sub-Type"],
-                            "sensor_given_name": sensor["Sensor Name"],
-                            "sensor_value": sensor["Value"],
-                            "sensor_measure_unit": sensor["Unit"],
-                            "sensor_health_state": sensor["State"],
-                            "sensor_unit_at": {
-                                "unit_id": unit["Unit Id"],
-                                "unit_name": sensor["Unit Name"],
-                                "unit_alias": sensor["Unit Alias"],
-                            },
-                            "sensor_location_at": {
-                                "location_id": loc["id"],
-                                "location_name": loc["name"],
-                                "location_alias": find_loc_alias(loc),
-                            },
-                            "sensor_type_alt": _get_alt_sensor_type(sensor)
-                            # "Sensor Name": "B2 Bsmnt 1_temp",
-                            # "Sensor Alias": "B2 Bsmnt 1_temp",
-                            # "Percentage": null,
-                            # "Value Duration Minutes": null,
-                            # "Threshold crosses": null
-                        }
-                        for sensor in responses["units"][unit["Unit Id"]][
-                            "uv_unit_metrics"
-                        ]
-                    ],
+                    "unit_location_at": location_at,
+                    "unit_sensors": unit_sensors,
                 }
-                for unit in responses["warehouses"][loc["id"]]["wv_unit_summary"]
+            )
+
+        yield {
+            "location_id": loc_id,
+            "location_name": loc["name"],
+            "location_coords": {
+                "latitude": loc["latitude"],
+                "longitude": loc["longitude"],
+            },
+            "location_health_state": loc["state"],
+            "location_alias": loc_alias,
+            "location_summary": responses["location_summary"][loc_id],
+            "warehouse_sensors": [
+                _normalize_sensor(sensor, warlvl_unit_at, location_at)
+                for sensor in warlvl_details["wv_warehouse_metrics"]
             ],
+            "warehouse_units": warehouse_units,
         }
-        for loc in responses["locations"]
-    ]
 
-    return parsed
+
+def parse_genesis_apis(responses: dict):
+    return {
+        "metadata": {
+            "website_owner": "phAIdelta",
+            "genesis_instance_owner": "The Warehouse Company (TWC)",
+        },
+        "locations": list(iter_genesis_locations(responses)),
+    }
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scrape Genesis and save it to the vectorstore"
+    )
+    parser.add_argument(
+        "--async-crawl",
+        action="store_true",
+        help="Crawl the APIs concurrently instead of one request at a time",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=SCRAPE_CONCURRENCY,
+        help="Maximum in-flight requests for --async-crawl (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=GENESIS_BASE_URL,
+        help="Genesis server to scrape, eg: a local mock (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Only embed new/changed documents and delete removed ones, instead of re-inserting everything",
+    )
+    args = parser.parse_args()
+
+    request_headers = {
+        "Content-Type": "application/json",
+        "Authorization": "Bearer %s" % GenesisSettings().auth_token,
+    }
+
     with LiveServerSession(
-        base_url=GENESIS_BASE_URL,
+        base_url=args.base_url,
         backend=REQUESTS_CACHE,
         expire_after=REQUESTS_CACHE_EXPIRY,
     ) as sess:
         docs_to_save: List[Document] = []
-        sess.headers.update(
-            {
-                "Content-Type": "application/json",
-                "Authorization": "Bearer %s" % _settings.auth_token,
-            }
-        )
+        sess.headers.update(request_headers)
 
         import time
 
         start_time = time.time()
         print("Scraping APIs...")
-        genesis_data = scrape_all_genesis(sess)
+        if args.async_crawl:
+            genesis_data = asyncio.run(
+                async_scrape_all_genesis(
+                    args.base_url,
+                    headers=request_headers,
+                    concurrency=args.concurrency,
+                )
+            )
+        else:
+            genesis_data = scrape_all_genesis(sess)
 
         print("Parsing...")
         parsed_data = parse_genesis_apis(genesis_data)
@@ -586,18 +884,36 @@ if __name__ == "__main__":
         print("Inserting...")
         insert_time = time.time()
 
-        VECTORSTORE.delete_embeddings()
+        VECTORSTORE = get_vectorstore(VECTORSTORE_NAME)
+
+        insert_batch_size = max(8, int(len(export_docs) / 25))
+
+        if args.sync:
+            num_added, num_deleted, num_unchanged = sync_documents(
+                VECTORSTORE, export_docs, batch_size=insert_batch_size
+            )
+            print(
+                "Synced: %d added, %d deleted, %d unchanged"
+                % (num_added, num_deleted, num_unchanged)
+            )
+        else:
+            VECTORSTORE.delete_embeddings()
 
-        for batch in tqdm.tqdm(
-            make_batches(export_docs, batch_size=max(8, int(len(export_docs) / 25))),
-            unit="doc",
-        ):
-            VECTORSTORE.add_documents(batch)
+            for batch in tqdm.tqdm(
+                make_batches(export_docs, batch_size=insert_batch_size),
+                unit="doc",
+            ):
+                VECTORSTORE.add_documents(batch, ids=list(map(document_id, batch)))
 
         if hasattr(VECTORSTORE, "persist"):
             VECTORSTORE.persist()
+        # Cached answers built from the previous data are stale now
+        mark_genesis_snapshot()
         finish_time = time.time()
 
+        if hasattr(VECTORSTORE.embedding_function, "stats"):
+            print("Embedding cache: %s" % VECTORSTORE.embedding_function.stats())
+
         print(
             "Took %.2f seconds (%.2fs parsing, %.2fs uploading)"
             % (
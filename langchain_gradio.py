@@ -1,10 +1,15 @@
 
 import enum
-from typing import Optional, List, Tuple, Dict, Any, Union, Callable
+from typing import Optional, List, Tuple, Dict, Any, Union, Callable, Deque
 
 import logging
 import asyncio
 import queue
+import time
+import weakref
+import threading
+from collections import deque
+from functools import partial
 from concurrent.futures.thread import ThreadPoolExecutor
 from tempfile import _TemporaryFileWrapper
 
@@ -18,11 +23,9 @@ from langchain.schema import AgentAction, AgentFinish, LLMResult
 
 from langchain.llms.openai import OpenAI
 from langchain.chat_models.openai import ChatOpenAI
-from langchain.vectorstores import Chroma, PGVector
 
-from vectorstores.doc_chroma import chromadb
-from vectorstores.genesis_pg import genesisdb
-from sqlalchemy.orm import Session
+from vectorstores.registry import get_vectorstore, vectorstore_names
+from vectorstores.stats import source_stats
 
 from dotenv import load_dotenv
 import gradio as gr
@@ -48,66 +51,47 @@ class ModelExecMode(str, enum.Enum):
 TARGET_SOURCE_CHUNKS = 12
 MODEL_EXEC_MODE = ModelExecMode.ASYNC
 
+MAX_CONCURRENT_GENERATIONS = 8
+"""Chains running at once across all users, the others wait in line"""
+QUEUE_POSITION_INTERVAL = 1.0
+"""Seconds between checks of a waiting user's position in line"""
 
-ALL_VECTORSTORES: Dict[str, Optional[VectorStore]] = dict(
-    none = None,
-    chromadb = chromadb,
-    genesisdb = genesisdb,
-)
+STREAM_FRAME_INTERVAL = 0.05
+"""Streamed tokens are sent to the UI at most this often (seconds)..."""
+STREAM_FRAME_MAX_TOKENS = 32
+"""...or as soon as this many are waiting"""
+
+
+# Stores are built lazily by the registry when first selected
+ALL_VECTORSTORES: List[str] = ['none', *vectorstore_names()]
 
 CHAIN_EXAMPLES = [
     ["vanilla_llm:simple"],
     ["doc_parse:ask_doc_chain"],
     ["doc_parse:ask_genesis_chain"],
+    ["doc_parse:cached_ask_genesis_chain"],
     ["doc_parse:vectorstore_agent"],
     ["genesis.chat_chain:agent_chain"]
 ]
 
 # vectorstore collection utils
 
-def vs_doc_list(vs: str, *needed_info) -> List:
-    vstore = ALL_VECTORSTORES.get(vs)
-    all_docs = dict()
+def vs_doc_list(vs: str, *needed_info, offset: int = 0, limit: Optional[int] = None) -> List:
     response = []
-    if vstore is None:
-        return response
-
-    if isinstance(vstore, Chroma):
-        result = vstore._collection.get()
-        for doc_id, doc_data, metadata in zip(result['ids'], result['documents'], result['metadatas']):
-            if metadata.get('source'):
-                if metadata['source'] not in all_docs:
-                    all_docs[metadata['source']] = ([], [])
-                all_docs[metadata['source']][0].append(doc_id)
-                all_docs[metadata['source']][1].append(doc_data)
-    elif isinstance(vstore, PGVector):
-        with Session(vstore._conn) as session:
-            collection_data = vstore.get_collection(session)
-            if collection_data:
-                for embedding in collection_data.embeddings:
-                    doc_id = embedding.uuid
-                    doc_data = embedding.document
-                    metadata = embedding.cmetadata
-                    if metadata.get('source'):
-                        if metadata['source'] not in all_docs:
-                            all_docs[metadata['source']] = ([], [])
-                        all_docs[metadata['source']][0].append(doc_id)
-                        all_docs[metadata['source']][1].append(doc_data)
-
-    for doc_source, (doc_ids, doc_chunks) in all_docs.items():
+    for stats in source_stats(get_vectorstore(vs), offset=offset, limit=limit).sources:
         r = []
         for need in needed_info:
             if need == 'source':
-                r.append(doc_source)
+                r.append(stats.source)
             elif need == 'chunks':
-                r.append(len(doc_chunks))
+                r.append(stats.chunks)
             elif need == 'size':
-                r.append(sum(len(x) for x in doc_chunks))
+                r.append(stats.characters)
         response.append(r)
     return response
 
 def vs_collection_clear(vs: str):
-    vstore = ALL_VECTORSTORES.get(vs)
+    vstore = get_vectorstore(vs)
     if vstore is None:
         return
     vstore.delete()
@@ -150,8 +134,9 @@ def load_chain(
         chain_args['llm'] = llm
 
         # TODO: Check if the chain factory supports retriever in the first place
-        if vectorstore_name is not None and ALL_VECTORSTORES.get(vectorstore_name):
-            chain_args['retriever'] = ALL_VECTORSTORES[vectorstore_name].as_retriever(
+        vstore = get_vectorstore(vectorstore_name)
+        if vstore is not None:
+            chain_args['retriever'] = vstore.as_retriever(
                 search_kwargs={"k": TARGET_SOURCE_CHUNKS},
                 search_type='similarity',
             )
@@ -188,16 +173,99 @@ def clear_collection(vs: str, progress=gr.Progress()):
 async def handle_upload(files: List[_TemporaryFileWrapper], vs: str, progress=gr.Progress()):
     # Note: The _TemporaryFileWrapper is only useful for getting the filename as it has no access to its content
     from doc_ingest import upload_files
-    vstore = ALL_VECTORSTORES.get(vs)
-    upload_task = asyncio.get_event_loop().run_in_executor(None, upload_files, vstore, *files)
+    vstore = get_vectorstore(vs)
+
+    def report_progress(ingest_progress):
+        progress((ingest_progress.parts_done, ingest_progress.parts_total),
+                 desc="%d chunks written" % ingest_progress.chunks_written)
+
+    upload_task = asyncio.get_event_loop().run_in_executor(None, partial(upload_files, vstore, *files, progress=report_progress))
     new_uploaded_files = await upload_task
     return get_uploaded_files_list(vs)
 
 
+class TokenStream:
+    """Tokens of a chain run, read as an async iterator of text chunks, one per UI frame.
+
+    Tokens can be put from any thread. The reader is only woken up when a frame
+    is due (`frame_interval` after the previous one, or `max_frame_tokens`
+    waiting) or the stream is closed, not for every token.
+    """
+
+    def __init__(self, frame_interval: float = STREAM_FRAME_INTERVAL, max_frame_tokens: int = STREAM_FRAME_MAX_TOKENS):
+        self.frame_interval = frame_interval
+        self.max_frame_tokens = max_frame_tokens
+        self.frames = 0
+        self.tokens = 0
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._closed = False
+        self._last_frame = 0.0
+        # Woken once the reader's condition (pending tokens >= `_wake_at`) is met
+        self._waiter: Optional[asyncio.Future] = None
+        self._wake_at = 1
+
+    def _wake(self):
+        waiter, self._waiter = self._waiter, None
+        if waiter is None:
+            return
+        if threading.get_ident() == self._loop_thread:
+            if not waiter.done():
+                waiter.set_result(None)
+        else:
+            self._loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+
+    def put_nowait(self, token: str):
+        with self._lock:
+            self._pending.append(token)
+            if len(self._pending) >= self._wake_at:
+                self._wake()
+
+    def close(self):
+        """No more tokens. The reader gets what is pending, then the iteration ends"""
+        with self._lock:
+            self._closed = True
+            self._wake()
+
+    async def _wait(self, min_tokens: int, timeout: Optional[float] = None):
+        with self._lock:
+            if self._closed or len(self._pending) >= min_tokens:
+                return
+            self._waiter = self._loop.create_future()
+            self._wake_at = min_tokens
+            waiter = self._waiter
+        await asyncio.wait([waiter], timeout=timeout)
+        with self._lock:
+            if self._waiter is waiter:
+                self._waiter = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        await self._wait(1)
+        # Gather the frame's tokens, unless the previous frame is already long gone
+        frame_due = self._last_frame + self.frame_interval - time.monotonic()
+        if frame_due > 0:
+            await self._wait(self.max_frame_tokens, timeout=frame_due)
+
+        with self._lock:
+            tokens, self._pending = self._pending, []
+            if len(tokens) == 0 and self._closed:
+                raise StopAsyncIteration
+        self._last_frame = time.monotonic()
+        self.frames += 1
+        self.tokens += len(tokens)
+        return ''.join(tokens)
+
+
 class QueueCallbackHandler(BaseCallbackHandler):
-    _queue: Union[queue.Queue, asyncio.Queue]
+    _queue: Union[queue.Queue, asyncio.Queue, TokenStream]
 
-    def __init__(self, queue: Union[queue.Queue, asyncio.Queue]):
+    def __init__(self, queue: Union[queue.Queue, asyncio.Queue, TokenStream]):
         self._queue = queue
 
     def on_llm_start(
@@ -272,36 +340,87 @@ def _parse_llm_output(chain: Chain, result: Dict[str, str]) -> str:
     return '\n\n'.join(('%s:\n' % key.upper() if i > 0 else '') + result[key] for i, key in enumerate(chain.output_keys))
 
 
-def run_chain_sync(q: asyncio.Queue, chain: Chain, inputs: Union[str, Dict[str, str]]):
+def run_chain_sync(q: TokenStream, chain: Chain, inputs: Union[str, Dict[str, str]]):
     stream_callback = QueueCallbackHandler(queue=q)
     result = chain(inputs, callbacks=[stream_callback])
     return _parse_llm_output(chain, result)
 
-async def run_chain_async(q: asyncio.Queue, chain: Chain, inputs: Union[str, Dict[str, str]]):
+async def run_chain_async(q: TokenStream, chain: Chain, inputs: Union[str, Dict[str, str]]):
     stream_callback = QueueCallbackHandler(queue=q)
     result = await chain.acall(inputs, callbacks=[stream_callback])
     return _parse_llm_output(chain, result)
 
 
-class ChatWrapper:
-    def __init__(self):
-        self._lock = asyncio.Lock()
-        self._exec = ThreadPoolExecutor(2)
+class GenerationSlots:
+    """At most `capacity` generations run at once, the rest wait first-come first-served"""
 
-    async def prepare(self, user_message: str, history, chain_path: str, loaded_chain: Optional[Chain]):
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._running = 0
+        self._waiting: Deque[asyncio.Future] = deque()
+
+    def join(self) -> Optional[asyncio.Future]:
+        """Take a slot. Returns None if one was free, else a ticket that is done once it's this caller's turn"""
+        if self._running < self.capacity and len(self._waiting) == 0:
+            self._running += 1
+            return None
+        ticket = asyncio.get_running_loop().create_future()
+        self._waiting.append(ticket)
+        return ticket
+
+    def position(self, ticket: asyncio.Future) -> int:
+        """1-based position of a waiting ticket in line"""
+        try:
+            return self._waiting.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    def leave(self, ticket: Optional[asyncio.Future]):
+        """Give up the slot, or the place in line if the turn hasn't come yet"""
+        if ticket is not None and not ticket.done():
+            self._waiting.remove(ticket)
+            ticket.cancel()
+            return
+        # Hand the slot over to the next in line
+        if len(self._waiting) > 0:
+            self._waiting.popleft().set_result(None)
+        else:
+            self._running -= 1
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+
+class ChatWrapper:
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_GENERATIONS):
+        # One generation per user session at a time
+        self._session_locks: 'weakref.WeakValueDictionary[Optional[str], asyncio.Lock]' = weakref.WeakValueDictionary()
+        self._slots = GenerationSlots(max_concurrent)
+        # Sized to the slots, so sync chains never wait for a thread unseen
+        self._exec = ThreadPoolExecutor(max_concurrent, thread_name_prefix='chat-generate')
+
+    def _session_lock(self, request: Optional[gr.Request]) -> asyncio.Lock:
+        session = request.session_hash if request is not None else None
+        lock = self._session_locks.get(session)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session] = lock
+        return lock
+
+    async def prepare(self, user_message: str, history, chain_path: str, loaded_chain: Optional[Chain], request: gr.Request):
         if loaded_chain is None:
             if not chain_path:
                 raise ValueError("Provide path to the chain object")
             raise RuntimeError("Chain is still loading. Please try again in a bit.")
 
-        if self._lock.locked():
+        if self._session_lock(request).locked():
             raise RuntimeError("A chat operation is still in progress. Please wait till it finishes.")
 
         user_message = user_message.strip()
         if len(user_message) > 0:
-            async with self._lock:
-                new_message_pair = [user_message, None]
-                history.append(new_message_pair)
+            new_message_pair = [user_message, None]
+            history.append(new_message_pair)
         return history, user_message
 
     async def generate(
@@ -309,7 +428,8 @@ class ChatWrapper:
         user_message: str,
         history,
         mode: LLMOutputMode,
-        chain: Chain
+        chain: Chain,
+        request: gr.Request
     ):
         chat_idx = -1 # The latest chat message. We will be writing output to this one
         chat_output: Tuple[str, str] = history[chat_idx]
@@ -318,20 +438,46 @@ class ChatWrapper:
             yield history
             return
 
-        # Hold lock till done
-        async with self._lock:
-            llm_args = [chain, user_message]
+        # Hold the session's lock till done, also while waiting in line
+        async with self._session_lock(request):
+            ticket = self._slots.join()
+            try:
+                position = 0
+                while ticket is not None and not ticket.done():
+                    if self._slots.position(ticket) != position:
+                        position = self._slots.position(ticket)
+                        chat_output[1] = "Waiting in queue (position %d)..." % position
+                        yield history
+                    await asyncio.wait([ticket], timeout=QUEUE_POSITION_INTERVAL)
+
+                async for update in self._generate(user_message, history, mode, chain):
+                    yield update
+            finally:
+                self._slots.leave(ticket)
+
+    async def _generate(
+        self,
+        user_message: str,
+        history,
+        mode: LLMOutputMode,
+        chain: Chain
+    ):
+        chat_output: Tuple[str, str] = history[-1]
+        llm_args = [chain, user_message]
 
-            output_queue = asyncio.Queue()
+        token_stream = TokenStream()
 
-            if MODEL_EXEC_MODE == ModelExecMode.SYNC:
-                output_task = asyncio.get_running_loop().run_in_executor(
-                    self._exec, run_chain_sync, output_queue, *llm_args)
-            elif MODEL_EXEC_MODE == ModelExecMode.ASYNC:
-                output_task = asyncio.create_task(run_chain_async(output_queue, *llm_args))
-            else:
-                raise ValueError("Invalid MODEL_EXEC_MODE set (%s)" % MODEL_EXEC_MODE)
+        if MODEL_EXEC_MODE == ModelExecMode.SYNC:
+            output_task = asyncio.get_running_loop().run_in_executor(
+                self._exec, run_chain_sync, token_stream, *llm_args)
+        elif MODEL_EXEC_MODE == ModelExecMode.ASYNC:
+            output_task = asyncio.create_task(run_chain_async(token_stream, *llm_args))
+        else:
+            raise ValueError("Invalid MODEL_EXEC_MODE set (%s)" % MODEL_EXEC_MODE)
+        # Ends the stream however the run ends
+        output_task.add_done_callback(lambda _: token_stream.close())
 
+        try:
             chat_output[1] = "Generating..."
             yield history
 
@@ -339,127 +485,125 @@ class ChatWrapper:
                 chat_output[1] = await output_task
                 yield history
             elif mode == LLMOutputMode.STREAM:
-                fail_count = 0
                 chat_output[1] = ""
-                while not output_task.done() and fail_count < 3:
-                    try:
-                        token_task = asyncio.ensure_future(output_queue.get())
-
-                        done, pending = await asyncio.wait([token_task, output_task], return_when=asyncio.FIRST_COMPLETED, timeout=10)
-
-                        if token_task.done():
-                            chat_output[1] += await token_task
-                            output_queue.task_done()
-                            yield history
-                        elif token_task in pending:
-                            token_task.cancel()
-                    except (asyncio.CancelledError, asyncio.TimeoutError):
-                        fail_count += 1
-                    else:
-                        fail_count = 0
+                async for text in token_stream:
+                    chat_output[1] += text
+                    yield history
                 # chat_output[1] = await output_task
                 await output_task
                 yield history
             else:
                 yield history
                 return
+        finally:
+            # Gave up (eg: the user left), free the slot for the next one
+            output_task.cancel()
+
+def build_demo() -> gr.Blocks:
+    with gr.Blocks().queue(20) as demo:
+        loaded_llm = gr.State(get_llm)
+        loaded_chain = gr.State()
+        prepared_message = gr.State('')
+
+        with gr.Row(equal_height=False):
+            gr.Markdown("# PrivateGPT Demo")
 
-with gr.Blocks().queue(20) as demo:
-    loaded_llm = gr.State(get_llm)
-    loaded_chain = gr.State()
-    prepared_message = gr.State('')
-
-    with gr.Row(equal_height=False):
-        gr.Markdown("# PrivateGPT Demo")
-
-    with gr.Row():
-        tb_chain_path = gr.Textbox(
-            label="Chain factory function",
-            placeholder="Path to the chain module",
-            show_label=True,
-            lines=1,
-            type="text",
-            scale=8
-        )
-        with gr.Column(scale=1):
-            load_chain_btn = gr.Button("Load chain", size='sm')
-            reload_chain_btn = gr.Button("Reload chain", size='sm')
-
-        example_dataset = gr.Dataset(
-            components=[gr.Textbox(visible=False)],
-            samples=CHAIN_EXAMPLES,
-            label="Preset chains",
-            type="values",
-            samples_per_page=3
-        )
-
-    chat_engine = ChatWrapper()
-    chatbot = gr.Chatbot()
-
-    with gr.Column():
         with gr.Row():
-            txt_message = gr.Textbox(
-                label="Chat",
-                placeholder="Example: Describe the contents",
+            tb_chain_path = gr.Textbox(
+                label="Chain factory function",
+                placeholder="Path to the chain module",
+                show_label=True,
                 lines=1,
-                scale=11,
-                show_label=False
+                type="text",
+                scale=8
             )
-            submit = gr.Button(value="Send", variant="secondary", scale=1)
-
-        with gr.Row(variant="compact"):
-            rd_output_mode = gr.Radio(
-                [LLMOutputMode.DIRECT, LLMOutputMode.STREAM],
-                value=LLMOutputMode.DIRECT,
-                label="Output mode",
-                interactive=True
+            with gr.Column(scale=1):
+                load_chain_btn = gr.Button("Load chain", size='sm')
+                reload_chain_btn = gr.Button("Reload chain", size='sm')
+
+            example_dataset = gr.Dataset(
+                components=[gr.Textbox(visible=False)],
+                samples=CHAIN_EXAMPLES,
+                label="Preset chains",
+                type="values",
+                samples_per_page=3
             )
+
+        chat_engine = ChatWrapper()
+        chatbot = gr.Chatbot()
+
+        with gr.Column():
+            with gr.Row():
+                txt_message = gr.Textbox(
+                    label="Chat",
+                    placeholder="Example: Describe the contents",
+                    lines=1,
+                    scale=11,
+                    show_label=False
+                )
+                submit = gr.Button(value="Send", variant="secondary", scale=1)
+
+            with gr.Row(variant="compact"):
+                rd_output_mode = gr.Radio(
+                    [LLMOutputMode.DIRECT, LLMOutputMode.STREAM],
+                    value=LLMOutputMode.DIRECT,
+                    label="Output mode",
+                    interactive=True
+                )
+                with gr.Column():
+                    dd_select_vs = gr.Dropdown(
+                        choices=ALL_VECTORSTORES,
+                        value=ALL_VECTORSTORES[0],
+                        label="Vector Store",
+                        show_label=True,
+                        allow_custom_value=False,
+                        type="value"
+                    )
+                    gr.HTML("<span>* You will need to reload the chain after changing the vector store</span>")
+
+        with gr.Row():
+            file_upload_box = gr.File(file_count="multiple", label="Upload files", show_label=True, interactive=True)
             with gr.Column():
-                dd_select_vs = gr.Dropdown(
-                    choices=ALL_VECTORSTORES.keys(),
-                    value=list(ALL_VECTORSTORES.keys())[0],
-                    label="Vector Store",
-                    show_label=True,
-                    allow_custom_value=False,
-                    type="value"
+                list_files_ready = gr.DataFrame(
+                    value=lambda: get_uploaded_files_list(dd_select_vs.value),
+                    type="pandas",
+                    label="Documents in collection",
+                    interactive=False
                 )
-                gr.HTML("<span>* You will need to reload the chain after changing the vector store</span>")
+                btn_clear_col = gr.Button("Clear entire collection", variant="stop", size="sm")
 
-    with gr.Row():
-        file_upload_box = gr.File(file_count="multiple", label="Upload files", show_label=True, interactive=True)
-        with gr.Column():
-            list_files_ready = gr.DataFrame(
-                value=lambda: get_uploaded_files_list(dd_select_vs.value),
-                type="pandas",
-                label="Documents in collection",
-                interactive=False
-            )
-            btn_clear_col = gr.Button("Clear entire collection", variant="stop", size="sm")
+        gr.HTML("Demo application of a Langchain-based PrivateGPT.")
+
+        clr_msg_box = lambda: ''
+
+        submit.click(chat_engine.prepare, inputs=[txt_message, chatbot, tb_chain_path, loaded_chain], outputs=[chatbot, prepared_message]) \
+            .success(clr_msg_box, outputs=txt_message) \
+            .success(chat_engine.generate, inputs=[prepared_message, chatbot, rd_output_mode, loaded_chain], outputs=chatbot)
 
-    gr.HTML("Demo application of a Langchain-based PrivateGPT.")
+        txt_message.submit(chat_engine.prepare, inputs=[txt_message, chatbot, tb_chain_path, loaded_chain], outputs=[chatbot, prepared_message]) \
+            .success(clr_msg_box, outputs=txt_message) \
+            .success(chat_engine.generate, inputs=[prepared_message, chatbot, rd_output_mode, loaded_chain], outputs=chatbot)
 
-    clr_msg_box = lambda: ''
+        example_dataset.select(load_chain, inputs=[example_dataset, loaded_llm, dd_select_vs], outputs=[tb_chain_path, loaded_chain],
+            show_progress='minimal')
+        load_chain_btn.click(load_chain, inputs=[tb_chain_path, loaded_llm, dd_select_vs], outputs=[tb_chain_path, loaded_chain],
+            show_progress='minimal')
+        reload_chain_btn.click(reload_chain, inputs=[tb_chain_path, loaded_llm, dd_select_vs], outputs=[tb_chain_path, loaded_chain],
+            show_progress='minimal')
 
-    submit.click(chat_engine.prepare, inputs=[txt_message, chatbot, tb_chain_path, loaded_chain], outputs=[chatbot, prepared_message]) \
-        .success(clr_msg_box, outputs=txt_message) \
-        .success(chat_engine.generate, inputs=[prepared_message, chatbot, rd_output_mode, loaded_chain], outputs=chatbot)
+        # list_files_ready.upload(lambda x: print(x), inputs=list_files_ready)
 
-    txt_message.submit(chat_engine.prepare, inputs=[txt_message, chatbot, tb_chain_path, loaded_chain], outputs=[chatbot, prepared_message]) \
-        .success(clr_msg_box, outputs=txt_message) \
-        .success(chat_engine.generate, inputs=[prepared_message, chatbot, rd_output_mode, loaded_chain], outputs=chatbot)
+        dd_select_vs.select(get_uploaded_files_list, inputs=dd_select_vs, outputs=list_files_ready)
+        file_upload_box.upload(handle_upload, inputs=[file_upload_box, dd_select_vs], outputs=list_files_ready, show_progress='minimal')
+        btn_clear_col.click(clear_collection, inputs=dd_select_vs, outputs=list_files_ready)
 
-    example_dataset.select(load_chain, inputs=[example_dataset, loaded_llm, dd_select_vs], outputs=[tb_chain_path, loaded_chain],
-        show_progress='minimal')
-    load_chain_btn.click(load_chain, inputs=[tb_chain_path, loaded_llm, dd_select_vs], outputs=[tb_chain_path, loaded_chain],
-        show_progress='minimal')
-    reload_chain_btn.click(reload_chain, inputs=[tb_chain_path, loaded_llm, dd_select_vs], outputs=[tb_chain_path, loaded_chain],
-        show_progress='minimal')
+    return demo
 
-    # list_files_ready.upload(lambda x: print(x), inputs=list_files_ready)
 
-    dd_select_vs.select(get_uploaded_files_list, inputs=dd_select_vs, outputs=list_files_ready)
-    file_upload_box.upload(handle_upload, inputs=[file_upload_box, dd_select_vs], outputs=list_files_ready, show_progress='minimal')
-    btn_clear_col.click(clear_collection, inputs=dd_select_vs, outputs=list_files_ready)
+# doc_ingest's parser processes are spawned, and run this module again as `__mp_main__`:
+# they have no use for the UI
+if __name__ != "__mp_main__":
+    demo = build_demo()
 
 if __name__ == "__main__":
     demo.launch(enable_queue=True, show_error=True)
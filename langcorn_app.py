@@ -1,5 +1,7 @@
 
 from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 
 from langcorn import create_service
 from langcorn.server import api as lcorn_api
@@ -16,3 +18,90 @@ setattr(lcorn_api, 'derive_fields', _fixed_derive_fields)
 
 
 app: FastAPI = create_service("genesis.langcorn:chain")
+
+
+@app.on_event("shutdown")
+async def close_genesis_api_sessions():
+    """Close the Genesis API connections opened by async agent runs on this worker's event loop"""
+    from genesis.api_cache import close_aiohttp_session
+    await close_aiohttp_session()
+
+
+@app.get("/genesis/api-cache")
+def genesis_api_cache_stats() -> dict:
+    """Hit rate and staleness of the shared Genesis API response cache"""
+    from genesis.api_cache import get_response_cache
+    return get_response_cache().stats()
+
+
+@app.get("/genesis/answer-cache")
+def genesis_answer_cache_stats() -> dict:
+    """Hits, misses and near-miss similarities of the shared answer cache"""
+    from genesis.answer_cache import get_answer_cache
+    return get_answer_cache().stats()
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Latency, token and error metrics of agent runs in Prometheus format, summed over all workers"""
+    from genesis.metrics import render_metrics
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
+class GenesisSessionRequest(BaseModel):
+    input: str
+
+
+class GenesisSessionResponse(BaseModel):
+    session_id: str
+    output: str
+
+
+@app.post("/genesis/sessions/{session_id}/run")
+async def genesis_session_run(session_id: str, request: GenesisSessionRequest) -> GenesisSessionResponse:
+    """Run the Genesis agent with the conversation memory of `session_id`"""
+    from genesis.langcorn import agent_pool
+    output = await agent_pool.arun(session_id, request.input)
+    return GenesisSessionResponse(session_id=session_id, output=output)
+
+
+@app.post("/genesis/sessions/{session_id}/stream")
+async def genesis_session_stream(session_id: str, request: GenesisSessionRequest) -> StreamingResponse:
+    """Run the Genesis agent, streaming tokens, tool calls and the final answer as server-sent events"""
+    from genesis.langcorn import agent_pool
+    from genesis.streaming import stream_run_events
+    from genesis.config import get_stream_max_queued_events
+
+    async def sse():
+        events = stream_run_events(
+            lambda callbacks: agent_pool.arun(session_id, request.input, callbacks=callbacks),
+            max_queued_events=get_stream_max_queued_events()
+        )
+        try:
+            async for event in events:
+                yield event.to_sse()
+        finally:
+            # On client disconnect, cancels the agent run right away
+            await events.aclose()
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.delete("/genesis/sessions/{session_id}")
+def genesis_session_drop(session_id: str) -> dict:
+    """Forget the conversation of `session_id`"""
+    from genesis.langcorn import agent_pool
+    return {'session_id': session_id, 'dropped': agent_pool.drop(session_id)}
+
+
+@app.get("/genesis/sessions")
+def genesis_session_stats() -> dict:
+    """Resident sessions and evictions of the agent pool"""
+    from genesis.langcorn import agent_pool
+    return agent_pool.stats()
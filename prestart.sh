@@ -0,0 +1,8 @@
+#! /usr/bin/env bash
+
+# Run by the uvicorn-gunicorn image before gunicorn starts.
+# Metrics files of workers from a previous start would be counted again.
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
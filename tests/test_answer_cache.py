@@ -0,0 +1,41 @@
+from langchain.embeddings.base import Embeddings
+
+from genesis.answer_cache import AnswerCache, question_parameters
+
+
+class SameEmbeddings(Embeddings):
+    """Every text embeds the same, so only the parameters tell questions apart"""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+
+def make_cache() -> AnswerCache:
+    return AnswerCache(SameEmbeddings(), min_similarity=0.9, data_version=lambda: 0.0)
+
+
+def test_question_parameters():
+    assert question_parameters('How many sensors are out_of_range in unit B1?') == ('b1', 'out_of_range')
+    assert question_parameters('Status of warehouse 2 in Verna') == ('2', 'verna')
+    assert question_parameters('Is "cold room" open?') == ('cold room',)
+    assert question_parameters('How many warehouses are there?') == ()
+
+
+def test_similar_question_about_another_unit_is_a_miss():
+    cache = make_cache()
+    cache.store('agent', 'How many sensors are out_of_range in unit B1?', {'output': '3 sensors'})
+
+    assert cache.lookup('agent', 'How many sensors are out_of_range in unit B2?') is None
+    assert cache.parameter_mismatches == 1
+    assert cache.lookup('agent', 'Which sensors are out_of_range in unit B1') == {'output': '3 sensors'}
+    assert cache.semantic_hits == 1
+
+
+def test_unanswered_outputs_are_not_stored():
+    cache = make_cache()
+    cache.store('agent', 'How many warehouses are there?', {'output': "I don't know."})
+    assert cache.lookup('agent', 'How many warehouses are there?') is None
+    assert cache.unanswered == 1
@@ -0,0 +1,43 @@
+import json
+
+from genesis.genesis_api.render import render_sensor_table, render_unit_table, requested_columns
+
+
+SENSORS = [
+    {'Sensor Id': 7, 'Sensor Name': 'Door', 'Value': 'open', 'State': 'out_of_range',
+     'Metric Type': 'Door', 'Metric Sub-Type': 'Contact'},
+    {'Sensor Id': 3, 'Sensor Name': 'Temp', 'Value': 23.5, 'Unit': 'Celsius', 'Value Duration Minutes': 30,
+     'State': 'in_range', 'Metric Type': 'Climate', 'Metric Sub-Type': 'Temperature'},
+]
+
+UNITS = [
+    {'Unit Id': 1, 'Unit Name': 'Freezer B1', 'Unit Alias': 'Cold room', 'Value': 2, 'State': 'out_of_range'},
+]
+
+
+def test_sensor_table_projects_requested_columns():
+    text = render_sensor_table('Sensors', SENSORS, columns=['Sensor Name', 'Value'])
+    assert 'Sensor data format: Name // Value\n' in text
+    assert 'Temp // 23.5 Celsius(for 30)\n' in text
+    assert 'Door // open\n' in text
+    assert 'out_of_range' not in text
+
+
+def test_sensor_table_groups_by_type():
+    lines = render_sensor_table('Sensors', SENSORS).splitlines()
+    assert lines.index('## Climate') < lines.index('### Temperature') < lines.index('## Door')
+
+
+def test_unknown_columns_fall_back_to_the_defaults():
+    assert render_unit_table('Units', UNITS, columns=['Nope']) == render_unit_table('Units', UNITS)
+
+
+def test_unit_table_projects_requested_columns():
+    text = render_unit_table('Units', UNITS, columns=['Unit Id', 'Unit Name'])
+    assert text.endswith('> Data format: Unit ID, `Name (alias)`\n1, `Freezer B1(Cold room)`\n')
+
+
+def test_requested_columns():
+    assert requested_columns(json.dumps({'columns': ['Value', 'State']})) == ['Value', 'State']
+    assert requested_columns('warehouse 2') is None
+    assert requested_columns(json.dumps({'warehouse': 2})) is None
@@ -0,0 +1,99 @@
+import threading
+
+from genesis.genesis_api.unit_index import UnitNameIndex
+
+
+def unit_row(unit_id, warehouse_id, name, alias=None):
+    return {'Unit Id': unit_id, 'warehouse_id': warehouse_id, 'Unit Name': name, 'Unit Alias': alias}
+
+
+ROWS = [
+    unit_row(1, 10, 'Freezer B1', 'Cold room'),
+    unit_row(2, 10, 'Freezer B2'),
+    unit_row(3, 20, 'Chiller A'),
+    unit_row(4, 20, 'Freezer B1 North'),
+]
+
+
+def test_exact_name_ranks_first():
+    index = UnitNameIndex(lambda: ROWS)
+    matches = index.search('freezer b1', limit=3)
+    assert [m.unit.unit_id for m in matches][0] == 1
+    assert matches[0].score == 1.0
+    assert all(a.score >= b.score for a, b in zip(matches, matches[1:]))
+
+
+def test_alias_and_name_give_one_match_per_unit():
+    index = UnitNameIndex(lambda: ROWS)
+    assert [m.unit.unit_id for m in index.search('cold room', limit=5)] == [1]
+    unit_ids = [m.unit.unit_id for m in index.search('freezer', limit=5, min_score=0.1)]
+    assert len(unit_ids) == len(set(unit_ids))
+
+
+def test_typo_still_matches():
+    index = UnitNameIndex(lambda: ROWS)
+    assert index.search('chiler a')[0].unit.unit_id == 3
+
+
+def test_exact_match_in_another_warehouse_falls_back_to_fuzzy():
+    index = UnitNameIndex(lambda: ROWS)
+    matches = index.search('freezer b1', warehouse_id=20)
+    assert [m.unit.unit_id for m in matches] == [4]
+    assert matches[0].score < 1.0
+
+
+def test_searches_during_a_refresh_see_the_previous_build():
+    builds = [ROWS, [unit_row(5, 10, 'Freezer B1')]]
+    started, release = threading.Event(), threading.Event()
+
+    def loader():
+        rows = builds.pop(0)
+        if not builds:
+            started.set()
+            release.wait(5)
+        yield from rows
+
+    index = UnitNameIndex(loader)
+    index.refresh()
+    refresh = threading.Thread(target=index.refresh, kwargs={'force': True})
+    refresh.start()
+    assert started.wait(5)
+
+    matches = index.search('freezer b1', limit=3)
+    assert [m.unit.unit_id for m in matches][0] == 1
+    assert {m.unit.unit_id for m in matches} <= {1, 2, 4}
+
+    release.set()
+    refresh.join(5)
+    assert [m.unit.unit_id for m in index.search('freezer b1', limit=3)] == [5]
+
+
+def test_searches_never_mix_two_builds():
+    generation = [0]
+
+    def loader():
+        generation[0] += 1
+        # Every build lists the units in another order, under other IDs
+        names = ['Freezer B%d' % i for i in range(10)]
+        if generation[0] % 2:
+            names.reverse()
+        return [unit_row(1000 * generation[0] + i, 10, name) for i, name in enumerate(names)]
+
+    index = UnitNameIndex(loader)
+    index.refresh()
+    stop = threading.Event()
+
+    def rebuild():
+        while not stop.is_set():
+            index.refresh(force=True)
+
+    refresher = threading.Thread(target=rebuild)
+    refresher.start()
+    try:
+        for _ in range(300):
+            matches = index.search('freezer b3', limit=5, min_score=0.1)
+            assert matches[0].unit.name == 'Freezer B3'
+            assert len({m.unit.unit_id // 1000 for m in matches}) == 1
+    finally:
+        stop.set()
+        refresher.join(5)
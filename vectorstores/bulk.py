@@ -0,0 +1,57 @@
+"""Bulk writes of already-embedded documents.
+
+`VectorStore.add_documents` embeds the texts itself and (for PGVector) adds
+the rows one ORM object at a time. Ingestion embeds in its own batches, so it
+writes the vectors it already has with a single bulk insert per batch.
+"""
+
+import uuid
+
+from sqlalchemy.orm import Session
+
+from langchain.embeddings.base import Embeddings
+from langchain.vectorstores.base import VectorStore
+from langchain.schema import Document
+
+from typing import List, Optional
+
+
+def get_embedding_function(store: VectorStore) -> Optional[Embeddings]:
+    """The embedding model of the store, if it has one we can call directly"""
+    return getattr(store, 'embedding_function', None) or getattr(store, '_embedding_function', None)
+
+
+def add_embedded_documents(store: VectorStore, documents: List[Document], vectors: List[List[float]]) -> List[str]:
+    """Write documents with their vectors. Stores we can't write vectors to directly re-embed them"""
+    from langchain.vectorstores import Chroma, PGVector
+
+    ids = [str(uuid.uuid1()) for _ in documents]
+
+    if isinstance(store, PGVector):
+        with Session(store._conn) as session:
+            collection = store.get_collection(session)
+            if collection is None:
+                raise ValueError("Collection not found")
+            session.bulk_insert_mappings(store.EmbeddingStore, [
+                {
+                    'embedding': vector,
+                    'document': doc.page_content,
+                    'cmetadata': doc.metadata,
+                    'custom_id': doc_id,
+                    'collection_id': collection.uuid,
+                }
+                for doc, vector, doc_id in zip(documents, vectors, ids)
+            ])
+            session.commit()
+        return ids
+
+    if isinstance(store, Chroma):
+        store._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[doc.page_content for doc in documents],
+            metadatas=[doc.metadata for doc in documents],
+        )
+        return ids
+
+    return store.add_documents(documents, ids=ids)
@@ -1,21 +1,30 @@
 
-from .hf_embedding import embeddings
+from .hf_embedding import get_embeddings
 
 from langchain.vectorstores import Chroma
 
-from chromadb.config import Settings as ChromaSettings
-
 
 PERSIST_DIRECTORY = './datastore/'
 
-CHROMA_SETTINGS = ChromaSettings(
-    chroma_db_impl='duckdb+parquet',
-    persist_directory=PERSIST_DIRECTORY,
-    anonymized_telemetry=False
-)
-
-chromadb = Chroma(
-    embedding_function=embeddings,
-    client_settings=CHROMA_SETTINGS,
-    persist_directory=PERSIST_DIRECTORY
-)
+
+def get_chromadb() -> Chroma:
+    from chromadb.config import Settings as ChromaSettings
+
+    chroma_settings = ChromaSettings(
+        chroma_db_impl='duckdb+parquet',
+        persist_directory=PERSIST_DIRECTORY,
+        anonymized_telemetry=False
+    )
+
+    return Chroma(
+        embedding_function=get_embeddings(),
+        client_settings=chroma_settings,
+        persist_directory=PERSIST_DIRECTORY
+    )
+
+
+def __getattr__(name: str):
+    if name == 'chromadb':
+        from .registry import get_vectorstore
+        return get_vectorstore('chromadb')
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -0,0 +1,151 @@
+
+import os
+import array
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from langchain.embeddings.base import Embeddings
+
+from typing import List, Dict, Optional
+
+
+EMBEDDING_CACHE_PATH = '.cache/embeddings.db'
+EMBEDDING_CACHE_MEMORY_ITEMS = 20000
+"""How many vectors to keep in the in-memory LRU"""
+
+_SQLITE_MAX_VARIABLES = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches vectors by a hash of the text.
+
+    Lookups go to a bounded in-memory LRU first, then to an on-disk SQLite
+    store, and only the remaining misses are sent to the wrapped model.
+    """
+
+    def __init__(self,
+                 underlying: Embeddings,
+                 namespace: str,
+                 db_path: Optional[str] = EMBEDDING_CACHE_PATH,
+                 max_memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS):
+        self.underlying = underlying
+        self.namespace = namespace
+        self.max_memory_items = max_memory_items
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: 'OrderedDict[str, List[float]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if db_path is not None:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)')
+            self._db.commit()
+
+    def __getattr__(self, name: str):
+        # Anything else (model_name, client, etc.) comes from the wrapped model
+        if name == 'underlying':
+            raise AttributeError(name)
+        return getattr(self.underlying, name)
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(('%s\0%s\0%s' % (self.namespace, kind, text)).encode()).hexdigest()
+
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+        return vector
+
+    def _memory_put(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        if self._db is None:
+            return found
+        for i in range(0, len(keys), _SQLITE_MAX_VARIABLES):
+            batch = keys[i:i + _SQLITE_MAX_VARIABLES]
+            rows = self._db.execute(
+                'SELECT key, vector FROM embeddings WHERE key IN (%s)' % ','.join('?' * len(batch)),
+                batch
+            )
+            for key, blob in rows:
+                found[key] = array.array('f', blob).tolist()
+        return found
+
+    def _disk_put(self, items: Dict[str, List[float]]):
+        if self._db is None or len(items) == 0:
+            return
+        self._db.executemany(
+            'INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)',
+            [(key, array.array('f', vector).tobytes()) for key, vector in items.items()]
+        )
+        self._db.commit()
+
+    def _embed_cached(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for key in keys:
+                if key not in vectors:
+                    vector = self._memory_get(key)
+                    if vector is not None:
+                        vectors[key] = vector
+                        self.memory_hits += 1
+
+            missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+            from_disk = self._disk_get(missing)
+            self.disk_hits += len(from_disk)
+            for key, vector in from_disk.items():
+                vectors[key] = vector
+                self._memory_put(key, vector)
+
+        missing_texts = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if len(missing_texts) > 0:
+            if kind == 'query':
+                computed = [self.underlying.embed_query(text) for text in missing_texts.values()]
+            else:
+                computed = self.underlying.embed_documents(list(missing_texts.values()))
+            new_vectors = dict(zip(missing_texts.keys(), computed))
+
+            with self._lock:
+                self.misses += len(new_vectors)
+                self._disk_put(new_vectors)
+                for key, vector in new_vectors.items():
+                    self._memory_put(key, vector)
+            vectors.update(new_vectors)
+
+        return [vectors[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached('document', texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_cached('query', [text])[0]
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+            'memory_items': len(self._memory),
+        }
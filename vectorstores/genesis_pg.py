@@ -3,7 +3,7 @@
 from langchain.vectorstores.pgvector import PGVector
 from pydantic import BaseSettings, PostgresDsn
 
-from .hf_embedding import embeddings
+from .hf_embedding import get_embeddings
 
 
 class GenesisVectorStoreSettings(BaseSettings):
@@ -16,12 +16,19 @@ class GenesisVectorStoreSettings(BaseSettings):
         env_prefix = 'genesis_'
 
 
-_settings = GenesisVectorStoreSettings()
+def get_genesisdb() -> PGVector:
+    settings = GenesisVectorStoreSettings()
 
+    return PGVector(
+        connection_string=settings.db_connection_string,
+        embedding_function=get_embeddings(),
+        collection_name=settings.collection_name,
+        collection_metadata={"host": settings.host_url}
+    )
 
-genesisdb = PGVector(
-    connection_string=_settings.db_connection_string,
-    embedding_function=embeddings,
-    collection_name=_settings.collection_name,
-    collection_metadata={"host": _settings.host_url}
-)
+
+def __getattr__(name: str):
+    if name == 'genesisdb':
+        from .registry import get_vectorstore
+        return get_vectorstore('genesisdb')
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
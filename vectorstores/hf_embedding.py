@@ -1,8 +1,12 @@
 
 
-from langchain.embeddings import HuggingFaceEmbeddings
+from functools import lru_cache
+
+from langchain.embeddings.base import Embeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from .embedding_cache import CachedEmbeddings
+
 
 SPLIT_CHUNK_SIZE = 500
 SPLIT_CHUNK_OVERLAP = 30
@@ -11,7 +15,23 @@ SPLIT_CHUNK_OVERLAP = 30
 EMBEDDINGS_MODEL_NAME = "all-MiniLM-L6-v2"
 
 
-embeddings = HuggingFaceEmbeddings(model_name=EMBEDDINGS_MODEL_NAME)
+@lru_cache()
+def get_embeddings() -> Embeddings:
+    """Shared embedding model, loaded on first use"""
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name=EMBEDDINGS_MODEL_NAME),
+        namespace=EMBEDDINGS_MODEL_NAME
+    )
+
+
+def __getattr__(name: str):
+    # `embeddings` used to be built at import time. Keep it importable, but lazy.
+    if name == 'embeddings':
+        return get_embeddings()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
 
 text_doc_splitter = RecursiveCharacterTextSplitter(
     chunk_size=SPLIT_CHUNK_SIZE,
@@ -0,0 +1,83 @@
+"""Lazy registry of the vectorstores used across the project.
+
+Stores are only constructed (model loaded, database connected) the first time
+they are requested, and each one is built at most once per process. Tests can
+inject a ready-made store, such as an in-memory one, with `set_vectorstore`.
+"""
+
+import threading
+from importlib import import_module
+
+from langchain.vectorstores.base import VectorStore
+
+from typing import Callable, Dict, List, Optional, Union
+
+
+VectorStoreFactory = Callable[[], VectorStore]
+
+_factories: Dict[str, Union[str, VectorStoreFactory]] = {
+    'chromadb': 'vectorstores.doc_chroma:get_chromadb',
+    'genesisdb': 'vectorstores.genesis_pg:get_genesisdb',
+}
+# Stores built by their factory
+_instances: Dict[str, VectorStore] = {}
+# Stores injected by `set_vectorstore`, taking precedence over the factories
+_injected: Dict[str, VectorStore] = {}
+_lock = threading.Lock()
+
+
+def register_vectorstore(name: str, factory: Union[str, VectorStoreFactory]):
+    """Register a factory (callable or "module:function" path) for a store name.
+
+    It replaces any store built or injected under that name, so the next
+    `get_vectorstore` builds one from this factory.
+    """
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+        _injected.pop(name, None)
+
+
+def set_vectorstore(name: str, store: Optional[VectorStore]):
+    """Inject an already-built store, used instead of the registered factory (if any).
+
+    Passing None removes the injected store, and also the store built by the
+    factory, so the next `get_vectorstore` builds a fresh one from the factory
+    or gives None if there is no factory.
+    """
+    with _lock:
+        _instances.pop(name, None)
+        if store is None:
+            _injected.pop(name, None)
+        else:
+            _injected[name] = store
+
+
+def vectorstore_names() -> List[str]:
+    return list(dict.fromkeys([*_factories, *_injected]))
+
+
+def _resolve_factory(factory: Union[str, VectorStoreFactory]) -> VectorStoreFactory:
+    if isinstance(factory, str):
+        module_name, func_name = factory.split(':', 1)
+        return getattr(import_module(module_name), func_name)
+    return factory
+
+
+def get_vectorstore(name: Optional[str]) -> Optional[VectorStore]:
+    """Get the store by name, building it on first use. Unknown names give None"""
+    if name is None:
+        return None
+    store = _injected.get(name, _instances.get(name))
+    if store is not None:
+        return store
+
+    with _lock:
+        store = _injected.get(name, _instances.get(name))
+        if store is None:
+            factory = _factories.get(name)
+            if factory is None:
+                return None
+            store = _resolve_factory(factory)()
+            _instances[name] = store
+    return store
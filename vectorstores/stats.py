@@ -0,0 +1,215 @@
+"""Chunk and character counts per document source of a vectorstore.
+
+Counting used to load every row of the collection, vectors included, and
+aggregate them in Python. Here:
+
+- PGVector: a summary table, `langchain_pg_source_stats`, holds the counts per
+  (collection, source). It is created and back-filled on first use and then
+  kept up to date by statement-level triggers on `langchain_pg_embedding`, so
+  reading it costs one indexed query however large the collection is. If the
+  table can't be created (eg: no permission), the counts are aggregated by a
+  GROUP BY in the database instead, which never reads the vectors.
+- Chroma: the collection is scanned page by page without embeddings. The
+  result isn't cached: upserts and syncs rewrite chunks without changing the
+  collection's size, so there's nothing cheap to tell it is stale.
+
+Results are sorted by source and can be paged with `offset`/`limit`.
+"""
+
+import logging
+import threading
+import weakref
+
+import sqlalchemy
+from sqlalchemy.orm import Session
+
+from langchain.vectorstores.base import VectorStore
+
+from typing import Dict, List, NamedTuple, Optional
+
+
+LOGGER = logging.getLogger(__name__)
+
+SOURCE_STATS_TABLE = 'langchain_pg_source_stats'
+CHROMA_SCAN_PAGE_SIZE = 5000
+
+
+class SourceStats(NamedTuple):
+    source: str
+    chunks: int
+    characters: int
+
+
+class SourceStatsPage(NamedTuple):
+    sources: List[SourceStats]
+    total_sources: int
+
+
+# PGVector
+
+_PG_SUMMARY_DDL = [
+    """
+    CREATE TABLE {table} (
+        collection_id UUID NOT NULL REFERENCES langchain_pg_collection (uuid) ON DELETE CASCADE,
+        source VARCHAR NOT NULL,
+        chunks BIGINT NOT NULL,
+        characters BIGINT NOT NULL,
+        PRIMARY KEY (collection_id, source)
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION {table}_add() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO {table} (collection_id, source, chunks, characters)
+        SELECT collection_id, cmetadata->>'source', count(*), coalesce(sum(length(document)), 0)
+        FROM new_rows
+        WHERE collection_id IS NOT NULL AND cmetadata->>'source' IS NOT NULL
+        GROUP BY collection_id, cmetadata->>'source'
+        ON CONFLICT (collection_id, source) DO UPDATE
+        SET chunks = {table}.chunks + EXCLUDED.chunks,
+            characters = {table}.characters + EXCLUDED.characters;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION {table}_remove() RETURNS trigger AS $$
+    BEGIN
+        UPDATE {table} AS stats
+        SET chunks = stats.chunks - removed.chunks,
+            characters = stats.characters - removed.characters
+        FROM (
+            SELECT collection_id, cmetadata->>'source' AS source, count(*) AS chunks,
+                   coalesce(sum(length(document)), 0) AS characters
+            FROM old_rows
+            WHERE collection_id IS NOT NULL AND cmetadata->>'source' IS NOT NULL
+            GROUP BY collection_id, cmetadata->>'source'
+        ) AS removed
+        WHERE stats.collection_id = removed.collection_id AND stats.source = removed.source;
+        DELETE FROM {table} WHERE chunks <= 0;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER {table}_add AFTER INSERT ON langchain_pg_embedding
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE {table}_add()
+    """,
+    """
+    CREATE TRIGGER {table}_remove AFTER DELETE ON langchain_pg_embedding
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE {table}_remove()
+    """,
+    # Back-fill with what was there before the triggers
+    """
+    INSERT INTO {table} (collection_id, source, chunks, characters)
+    SELECT collection_id, cmetadata->>'source', count(*), coalesce(sum(length(document)), 0)
+    FROM langchain_pg_embedding
+    WHERE collection_id IS NOT NULL AND cmetadata->>'source' IS NOT NULL
+    GROUP BY collection_id, cmetadata->>'source'
+    """,
+]
+
+# Engines whose summary table is known to exist (True) or to be unavailable (False)
+_pg_summary_ready: 'weakref.WeakKeyDictionary[sqlalchemy.engine.Engine, bool]' = weakref.WeakKeyDictionary()
+_pg_summary_lock = threading.Lock()
+
+
+def ensure_pg_source_stats_table(engine: sqlalchemy.engine.Engine) -> bool:
+    """Create the summary table and its triggers if missing. Returns whether it can be used"""
+    ready = _pg_summary_ready.get(engine)
+    if ready is not None:
+        return ready
+
+    with _pg_summary_lock:
+        ready = _pg_summary_ready.get(engine)
+        if ready is not None:
+            return ready
+        try:
+            with engine.begin() as conn:
+                # Serialize the check-and-create between processes
+                conn.execute(sqlalchemy.text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': SOURCE_STATS_TABLE})
+                exists = conn.execute(sqlalchemy.text("SELECT to_regclass(:name) IS NOT NULL"), {'name': SOURCE_STATS_TABLE}).scalar()
+                if not exists:
+                    # Same transaction as the back-fill, so no insert is counted twice or missed
+                    for statement in _PG_SUMMARY_DDL:
+                        conn.execute(sqlalchemy.text(statement.format(table=SOURCE_STATS_TABLE)))
+            ready = True
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            LOGGER.warning("Source stats table unavailable, counting with GROUP BY instead: %s", e)
+            ready = False
+        _pg_summary_ready[engine] = ready
+    return ready
+
+
+def _pg_source_stats(store: VectorStore, offset: int, limit: Optional[int]) -> SourceStatsPage:
+    with Session(store._conn) as session:
+        collection = store.get_collection(session)
+        if collection is None:
+            return SourceStatsPage([], 0)
+
+        # PGVector keeps a single connection, the table is set up over a connection of its own
+        if ensure_pg_source_stats_table(session.get_bind().engine):
+            table = sqlalchemy.table(
+                SOURCE_STATS_TABLE,
+                sqlalchemy.column('collection_id'),
+                sqlalchemy.column('source'),
+                sqlalchemy.column('chunks'),
+                sqlalchemy.column('characters'),
+            )
+            rows = sqlalchemy.select(table.c.source, table.c.chunks, table.c.characters) \
+                .where(table.c.collection_id == collection.uuid)
+        else:
+            embeddings = store.EmbeddingStore
+            source = embeddings.cmetadata['source'].astext
+            rows = sqlalchemy.select(
+                source.label('source'),
+                sqlalchemy.func.count().label('chunks'),
+                sqlalchemy.func.coalesce(sqlalchemy.func.sum(sqlalchemy.func.length(embeddings.document)), 0).label('characters'),
+            ).where(embeddings.collection_id == collection.uuid, source.isnot(None)).group_by(source)
+
+        rows = rows.subquery()
+        total = session.execute(sqlalchemy.select(sqlalchemy.func.count()).select_from(rows)).scalar()
+        page = sqlalchemy.select(rows).order_by(rows.c.source).offset(offset).limit(limit)
+        return SourceStatsPage(
+            [SourceStats(source, int(chunks), int(characters)) for source, chunks, characters in session.execute(page)],
+            total
+        )
+
+
+# Chroma
+
+def _chroma_scan(collection) -> List[SourceStats]:
+    totals: Dict[str, List[int]] = {}
+    offset = 0
+    while True:
+        # Never the embeddings
+        result = collection.get(include=['metadatas', 'documents'], offset=offset, limit=CHROMA_SCAN_PAGE_SIZE)
+        for document, metadata in zip(result['documents'], result['metadatas']):
+            source = (metadata or {}).get('source')
+            if source:
+                counts = totals.setdefault(source, [0, 0])
+                counts[0] += 1
+                counts[1] += len(document or '')
+        if len(result['ids']) < CHROMA_SCAN_PAGE_SIZE:
+            break
+        offset += CHROMA_SCAN_PAGE_SIZE
+    return sorted(SourceStats(source, chunks, characters) for source, (chunks, characters) in totals.items())
+
+
+def _chroma_source_stats(store: VectorStore, offset: int, limit: Optional[int]) -> SourceStatsPage:
+    stats = _chroma_scan(store._collection)
+    end = offset + limit if limit is not None else None
+    return SourceStatsPage(stats[offset:end], len(stats))
+
+
+def source_stats(store: Optional[VectorStore], offset: int = 0, limit: Optional[int] = None) -> SourceStatsPage:
+    """Chunks and characters per source, sorted by source, `limit` sources from `offset`"""
+    from langchain.vectorstores import Chroma, PGVector
+
+    if isinstance(store, PGVector):
+        return _pg_source_stats(store, offset, limit)
+    if isinstance(store, Chroma):
+        return _chroma_source_stats(store, offset, limit)
+    return SourceStatsPage([], 0)